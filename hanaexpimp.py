@@ -1,10 +1,15 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 from datetime import datetime, timedelta
-import sys, os, time, subprocess, re
+import sys, os, time, subprocess, re, json, math, zlib, gzip, shutil, csv
 from difflib import Differ
 import signal
 import fnmatch
+import threading
+import queue
+import copy
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import concurrent.futures
 
 def printHelp():
     print("                                                                                                                                   ")    
@@ -22,11 +27,25 @@ def printHelp():
     print("         ---- OUTPUT  ----                                                                                                         ")
     print(" -os     output sql [true/false], prints all crucial tasks, default: false                                                         ")
     print(" -op     output path, full literal path of the folder for the output logs (will be created if not there), default = '' (not used)  ")
+    print(" -mf     metrics folder, full literal path of the folder where, for every exported and imported view, the wall time of the      ")
+    print("         statement, bytes, rows, rows/s, MB/s, sleep/wait time and peak used memory during the statement are written, as json   ")
+    print("         lines to hanaexpimp_metrics_<VIEW>.jsonl and as a textfile for the prometheus node exporter to hanaexpimp_<VIEW>.prom,  ")
+    print("         default = '' (not used)                                                                                                   ")
     print("         ---- EXECUTE  ----                                                                                                        ")
     print(" -es     execute sql [true/false], execute all crucial tasks (useful to turn off for investigation with -os=true,                  ")
     print("         a.k.a. chicken mode :)  default: true                                                                                     ")
+    print("         ---- HDBSQL  ----                                                                                                         ")
+    print(" -hs     hdbsql string, the hdbsql executable to use, e.g. a local fake hdbsql script to test without a HANA system, default: hdbsql")
+    print(" -ps     persistent sessions, number of long-lived hdbsql sessions that all statements are sent through,                           ")
+    print("         0 --> a new hdbsql process is started for every statement, default: 1                                                     ")
     print("         ---- SLEEP  ----                                                                                                          ")
     print(" -st     sleep time [s], time to sleep, in seconds, between each export and each import, default: 60                                                          ")
+    print(" -mt     memory threshold [%], if > 0 the fixed sleep time is replaced by adaptive pacing, i.e. the next export/import starts as  ")
+    print("         soon as the used memory (worst of M_SERVICE_MEMORY and M_HOST_RESOURCE_UTILIZATION, in % of the allocation limit)    ")
+    print("         is below this threshold, default: 0 (not used, -st is used)                                                              ")
+    print(" -mw     max wait [s], maximum time to wait for the memory to go below -mt before continuing anyway, default: 3600               ")
+    print(" -pi     poll interval [s], first time to wait before the memory is checked again, doubled after every check, default: 10       ")
+    print(" -mpi    max poll interval [s], the doubled poll interval never gets longer than this, default: 60                                 ")
     print("         ---- TABLE and VIEWS  ----                                                                                                ")
     print(" -ts     table schema, the schema where the table is located, default: '' (must be defined)                                                   ")
     print(" -tn     table name, the name of the table to be imported back into, default: ""  (must be provided)                               ")
@@ -36,8 +55,73 @@ def printHelp():
     print(" -vp     view path, the full path to where the views will be exported, default: "" (must be provided)                              ")
     print(" -nv     number of views, the number of views to be exported, default: 10                                                          ")
     print(" -sv     start view number, the number of the first view to be exported, default: 1                                                ")
+    print("         ---- PARALLEL  ----                                                                                                       ")
+    print(" -par    parallel, number of views that are exported/imported at the same time, default: 1                                         ")
+    print(" -mb     memory budget [%], if > 0 no new export/import is started while the used memory (see -mt) is above this budget,           ")
+    print("         the memory is then checked again every -pi seconds, also used with -par 1, default: 0 (not used)                          ")
+    print("         ---- PLAN VIEWS  ----                                                                                                     ")
+    print(" -plan   plan views [true/false], true --> instead of exporting/importing, the views <view_name>_1 ... _<number views> are       ")
+    print("         planned (and created, if -es true) with near-equal numbers of rows, split on the partition column -pc,                 ")
+    print("         with -es true the boundaries are saved in <view path>partition_plan_<view name>.json and the number of views from         ")
+    print("         this file is used by later runs if -nv is not specified, default: false                                                   ")
+    print(" -pc     partition column, the column of the table the views are split on, default: "" (must be provided with -plan true)       ")
+    print(" -sp     sample percent [%], percent of the table that is sampled (TABLESAMPLE SYSTEM) to find the boundaries, default: 1         ")
+    print(" -cmb    chunk size [MB], if > 0 the number of views is chosen so that each view has about this in-memory size, default: 0       ")
+    print("         (not used, -nv views are planned)                                                                                         ")
     print("         ---- EXPORT/IMPORT  ----                                                                                                  ")
+    print(" -ec     exact count [true/false], true --> SELECT COUNT(*) of the table after every imported csv file, false --> the imported    ")
+    print("         rows are tracked with M_TABLES.RECORD_COUNT and checked against the rows of the csv files, and COUNT(*) is only          ")
+    print("         done before and after the import, default: false                                                                          ")
     print(" -exp    export [true/false], true --> export, false --> import, default: true                                                   ")
+    print("         ---- IMPORT OPTIONS  ----                                                                                                 ")
+    print(" -it     import threads, IMPORT FROM CSV FILE ... WITH THREADS <-it>, 0 --> not specified, default: 0                              ")
+    print("         (an import through a named pipe, see -cs, is always done without THREADS since the pipe can only be read in order)     ")
+    print(" -ib     import batch, IMPORT FROM CSV FILE ... WITH BATCH <-ib>, 0 --> not specified, default: 0                                  ")
+    print(" -tl     table lock [true/false], IMPORT FROM CSV FILE ... WITH TABLE LOCK, default: false                                         ")
+    print(" -at     auto tune [true/false], true --> the first imported csv file is split into one part per candidate in -atc, each part  ")
+    print("         is imported with its THREADS and BATCH while the used memory is sampled, and the candidate with the most rows per     ")
+    print("         second (with a peak memory below -mt, if -mt is used) is used for all other csv files, default: false                   ")
+    print(" -atc    auto tune candidates, comma separated list of <THREADS>x<BATCH>, default: 1x10000,4x50000,8x50000,16x200000              ")
+    print("         ---- DELTA MERGE  ----                                                                                                    ")
+    print(" -dm     delta merge control [true/false], true --> auto merge of the table is disabled during the import and the delta is    ")
+    print("         merged with MERGE DELTA OF after every -mk imported csv files and/or when the delta is larger than -mds,              ")
+    print("         at the end (also if the import fails or the run gets SIGTERM) the delta is merged and auto merge is enabled again if    ")
+    print("         it was, not if the run is killed with SIGKILL, default: false                                                             ")
+    print(" -mk     merge every, number of imported csv files between each delta merge with -dm true, 0 --> not used, default: 0              ")
+    print(" -mds    merge delta size [MB], the delta is merged when its size (M_CS_TABLES.MEMORY_SIZE_IN_DELTA) is larger than this,         ")
+    print("         0 --> not used, default: 0                                                                                                ")
+    print("         ---- VALIDATION  ----                                                                                                     ")
+    print(" -val    validate [true/false], true --> before anything is imported, every csv file is checked in a process pool: number     ")
+    print("         of columns (from TABLE_COLUMNS of the table), quoting and that numbers, dates and timestamps can be parsed,            ")
+    print("         if a row is bad the file, row number and byte offset are logged and nothing is imported (not used with -pl true),     ")
+    print("         default: false                                                                                                            ")
+    print(" -vw     validation workers, number of processes that validate the csv files, default: number of CPUs                            ")
+    print(" -vr     validation range [MB], large csv files are validated in ranges of this size by different processes, default: 256        ")
+    print("         ---- PIPELINE  ----                                                                                                       ")
+    print(" -pl     pipeline [true/false], true --> every view is exported and then imported, the import of one view runs while the       ")
+    print("         next views are exported, and each csv file is deleted once its import is verified (-exp is then not used),             ")
+    print("         default: false                                                                                                            ")
+    print(" -msf    max staged files, the maximum number of csv files that may exist at the same time with -pl true, a csv file             ")
+    print("         that is kept since its import could not be verified still counts, default: 2                                            ")
+    print("         ---- COMPRESSION  ----                                                                                                    ")
+    print(" -cs     compress staging [true/false], true --> every exported csv file is compressed to exported_<view>_<n>.csv.gz and the   ")
+    print("         csv file is removed, the import of a .csv.gz file decompresses it into a named pipe (FIFO) that IMPORT reads from,      ")
+    print("         so the uncompressed data is never written to disk again, the parts of -ab and -at are compressed and read through a       ")
+    print("         fifo as well, default: false                                                                                              ")
+    print(" -cl     compression level, gzip compression level from 1 (fastest) to 9 (smallest), default: 1                                    ")
+    print("         ---- BISECTION  ----                                                                                                      ")
+    print(" -ab     adaptive bisection [true/false], true --> if an export or import fails because HANA could not allocate enough memory,   ")
+    print("         the view is split on -pc into two temporary views <view_name>_<n>_1 and <view_name>_<n>_2 (found by sampling -sp      ")
+    print("         percent of the view) that are exported one after the other into the same csv file, and a csv file that fails to be     ")
+    print("         imported is split into two halves that are imported one after the other, the splits are logged and saved in the       ")
+    print("         manifest, the import is only split with -par 1 (or -pl true), since otherwise the rows imported by the other views        ")
+    print("         hide whether rows of the failed csv file were imported, default: false                                                    ")
+    print(" -bd     bisection depth, the maximum number of times a view or csv file is split in two, default: 3                               ")
+    print("         ---- RESUME  ----                                                                                                         ")
+    print(" -resume resume [true/false], the status, csv size, rows, checksum and timings of every view are always saved in                   ")
+    print("         <view path>hanaexpimp_manifest_<view name>.json, with -resume true views already exported/imported according to       ")
+    print("         this manifest are skipped and partly imported views are checked, so a stopped run can be started again with the same  ")
+    print("         input arguments, default: false                                                                                           ")
     print("                                                                                                                                   ")
     print("                                                                                                                                   ")
     print("EXAMPLES:                                                                                                                          ")
@@ -55,6 +139,9 @@ def printHelp():
     print(" This shows an example of a 'chicken mode' of checking the statements of importing back 1 out of 2 views without executing them    ")
     print("  python hanaexpimp.py -k SYSTEMKEYT1 -ts PLAYGROUND -tn MASS_DATA_PART_DEMO -vs SYSTEM -vn VIEWMASS -vp /usr/sap/CHP/HDB00/work/  ")
     print("  -nv 2 -sv 2 -exp false -st 1 -es false -os true                                                                                  ")
+    print(" This shows an example of creating 8 views on PLAYGROUND.MASS_DATA_PART_DEMO with about the same number of rows, split on COL1   ")
+    print("  python hanaexpimp.py -k SYSTEMKEYT1 -ts PLAYGROUND -tn MASS_DATA_PART_DEMO -vs SYSTEM -vn VIEWMASS -vp /usr/sap/CHP/HDB00/work/  ")
+    print("  -nv 8 -plan true -pc COL1                                                                                                        ")
     print("                                                                                                                                   ")
     print("                                                                                                                                   ")
     print("AUTHOR: Christian Hansen                                                                                                           ")
@@ -71,8 +158,62 @@ def printDisclaimer():
     print(' 4. HANAExpImp is to be used on "your own risk"                                                                                    ')
     os._exit(1)
 
+class SQLExecutionError(Exception):
+    pass
+
+class HDBSQLSession:
+    def __init__(self, hdbsql_command):
+        self.command = hdbsql_command
+        self.process = None
+        self.marker_number = 0
+    def start(self):
+        self.process = subprocess.Popen(self.command, shell=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, start_new_session=True)
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+    def execute(self, sql):
+        # every statement is followed by a marker select, everything hdbsql writes before the marker belongs to the statement
+        self.marker_number += 1
+        marker = "HANAEXPIMP_END_"+str(self.marker_number)
+        try:
+            self.process.stdin.write(sql.replace('\\"', '"')+"\n")
+            self.process.stdin.write("SELECT '"+marker+"' FROM DUMMY\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self.process = None
+            raise SQLExecutionError("The hdbsql session terminated unexpectedly")
+        out_lines = []
+        error_lines = []
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                self.process = None
+                raise SQLExecutionError("The hdbsql session terminated unexpectedly\n"+"\n".join(error_lines))
+            line = line.rstrip("\n")
+            if marker in line:
+                break
+            if error_lines or re.match(r"^\* -?[0-9]+: ", line):
+                error_lines.append(line)
+            else:
+                out_lines.append(line)
+        if error_lines:
+            raise SQLExecutionError("\n".join(error_lines))
+        return "\n".join(out_lines).strip("\n")
+    def close(self):
+        if self.is_alive():
+            try:
+                self.process.stdin.write("exit\n")
+                self.process.stdin.close()
+                self.process.wait(timeout = 10)
+            except (BrokenPipeError, OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+        self.process = None
+    def kill(self):
+        if self.is_alive():
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+
 class SQLManager:
-    def __init__(self, execute_sql, hdbsql_string, dbuserkey, DATABASE, log_sql):
+    def __init__(self, execute_sql, hdbsql_string, dbuserkey, DATABASE, log_sql, number_sessions = 0):
         self.execute = execute_sql
         self.key = dbuserkey
         self.db = DATABASE
@@ -87,6 +228,193 @@ class SQLManager:
             self.hdbsql_jAxU = hdbsql_string + " -j -A -x -U " + self.key
             self.hdbsql_jAaxU = hdbsql_string + " -j -A -a -x -U " + self.key
             self.hdbsql_jAQaxU = hdbsql_string + " -j -A -Q -a -x -U " + self.key
+        self.number_sessions = number_sessions
+        self.sessions = queue.Queue()
+        self.all_sessions = [HDBSQLSession(self.hdbsql_jAaxU) for i in range(number_sessions)]   # also those that are in use
+        for session in self.all_sessions:
+            self.sessions.put(session)
+        self.processes = set()   # the hdbsql processes of the statements that run without sessions
+        self.exit_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.stopping_thread = None   # set by stop(), after that only this thread can start statements, e.g. the exit statements
+        self.number_statements = 0
+        self.number_connections = 0
+        self.sql_time = 0.0
+        self.exit_sqls = []   # executed by exit_on_error before the run stops
+        self.metman = None   # its queued metrics are written by exit_on_error before the run stops
+    def run(self, sql):
+        start_time = time.time()
+        new_connection = False
+        if self.number_sessions:
+            session = self.sessions.get()
+            try:
+                with self.stats_lock:   # so that kill() cannot miss a session that is started now
+                    self.check_stopping()
+                    if not session.is_alive():
+                        session.start()
+                        new_connection = True
+                out = session.execute(sql)
+            finally:
+                self.sessions.put(session)
+        else:
+            new_connection = True
+            with self.stats_lock:   # so that kill() cannot miss a process that is started now
+                self.check_stopping()
+                process = subprocess.Popen(self.hdbsql_jAaxU + " \""+sql+"\"", shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, start_new_session=True)
+                self.processes.add(process)
+            [out, error] = process.communicate()   # if interrupted, e.g. by Ctrl-C, the process stays in processes and is killed by kill()
+            with self.stats_lock:
+                self.processes.discard(process)
+            if process.returncode:
+                raise subprocess.CalledProcessError(process.returncode, process.args, out, error)
+            out = out.strip("\n")
+        with self.stats_lock:
+            self.number_statements += 1
+            self.number_connections += 1 if new_connection else 0
+            self.sql_time += time.time() - start_time
+        return out
+    def close(self):
+        for i in range(self.number_sessions):
+            self.sessions.get().close()
+        self.number_sessions = 0
+    def check_stopping(self):
+        if self.stopping_thread is not None and self.stopping_thread is not threading.current_thread():
+            raise SQLExecutionError("The run is stopping, so no new statement is started")
+    def stop(self):
+        # after this no other thread can start a statement, since run() would restart the killed sessions
+        with self.stats_lock:
+            self.stopping_thread = threading.current_thread()
+    def kill(self):
+        # stops the statements of all views, so that none of them goes on after this process has exited
+        with self.stats_lock:
+            for session in self.all_sessions:
+                session.kill()
+            for process in self.processes:
+                os.killpg(process.pid, signal.SIGKILL)
+
+class CSVRowCounter:
+    # counts the rows of a HANA csv file block by block, a newline inside a quoted field (quotes are escaped as "") is not a new row
+    not_quote_or_newline = bytes(b for b in range(256) if b not in b'"\n')
+    def __init__(self):
+        self.rows = 0
+        self.size = 0
+        self.in_quote = False
+        self.last_byte = b"\n"
+        self.crc = 0
+    def update(self, block):
+        if not block:
+            return
+        self.crc = zlib.crc32(block, self.crc)
+        self.size += len(block)
+        # only quotes and newlines matter, and removing two adjacent quotes does not change if a newline is inside quotes
+        reduced = block.translate(None, self.not_quote_or_newline).replace(b'""', b'')
+        if not self.in_quote and b'"' not in reduced:
+            self.rows += reduced.count(b"\n")
+        else:
+            parts = reduced.split(b'"')
+            for i in range(1 if self.in_quote else 0, len(parts), 2):
+                self.rows += parts[i].count(b"\n")
+            if len(parts) % 2 == 0:
+                self.in_quote = not self.in_quote
+        self.last_byte = block[-1:]
+    def get_rows(self):
+        return self.rows + (0 if self.last_byte == b"\n" else 1)
+    def get_checksum(self):
+        return "%08x" % self.crc
+
+class RowCountManager:
+    def __init__(self, initial_rows, check_each_import):
+        self.expected_rows = initial_rows
+        self.check_each_import = check_each_import   # with parallel imports the record count of one import includes rows of others
+        self.lock = threading.Lock()
+
+class ManifestManager:
+    def __init__(self, manifest_file_name, resume, enabled):
+        self.file_name = manifest_file_name
+        self.resume = resume
+        self.enabled = enabled   # nothing is saved if the statements are not executed
+        self.lock = threading.Lock()
+        self.manifest = {"views": {}}
+        if os.path.exists(manifest_file_name):
+            with open(manifest_file_name) as manifest_file:
+                self.manifest = json.load(manifest_file)
+
+class StagingManager:
+    def __init__(self, compress, compression_level):
+        self.compress = compress
+        self.compression_level = compression_level
+
+class BisectionManager:
+    def __init__(self, enabled, partition_column, max_depth, sample_percent):
+        self.enabled = enabled
+        self.partition_column = partition_column
+        self.max_depth = max_depth
+        self.sample_percent = sample_percent
+
+class ImportManager:
+    def __init__(self, threads, batch, table_lock, auto_tune, candidates):
+        self.threads = threads
+        self.batch = batch
+        self.table_lock = table_lock
+        self.auto_tune = auto_tune
+        self.candidates = candidates   # [[threads, batch], ...]
+        self.lock = threading.Lock()
+        self.tuning_started = False
+        self.tuned = threading.Event()   # other imports wait for the auto tune to finish
+        if not auto_tune:
+            self.tuned.set()
+
+class DeltaMergeManager:
+    def __init__(self, enabled, merge_every, merge_delta_size):
+        self.enabled = enabled
+        self.merge_every = merge_every
+        self.merge_delta_size = merge_delta_size   # in MB
+        self.auto_merge_on = False   # the auto merge setting of the table before the import
+        self.imported_files = 0
+        self.lock = threading.Lock()
+
+class MemorySampler:
+    # samples the used memory in its own thread while a statement runs, needs an hdbsql session of its own
+    def __init__(self, sqlman, logman, interval = 1):
+        self.sqlman = sqlman
+        self.logman = logman
+        self.interval = interval
+        self.peak = 0.0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target = self.sample, daemon = True)
+    def sample(self):
+        while True:
+            self.peak = max(self.peak, get_used_memory_percent(self.sqlman, self.logman))
+            if self.stop_event.wait(self.interval):
+                break
+    def start(self):
+        self.thread.start()
+        return self
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        return self.peak
+
+class MetricsManager:
+    # the metrics of the views are written by a thread of its own, so the exports and imports do not wait for the files
+    def __init__(self, metrics_path, view_name):
+        self.enabled = bool(metrics_path)
+        self.json_file_name = metrics_path+"hanaexpimp_metrics_"+view_name+".jsonl"
+        self.prom_file_name = metrics_path+"hanaexpimp_"+view_name+".prom"
+        self.view_name = view_name
+        self.latest = {}   # [task, view number] --> the last metrics
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target = write_metrics, args = (self,), daemon = True)
+        if self.enabled:
+            self.thread.start()
+
+class SleepManager:
+    def __init__(self, sleep_time, memory_threshold, max_wait, poll_interval, max_poll_interval):
+        self.sleep_time = sleep_time
+        self.memory_threshold = memory_threshold
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
 
 class LogManager:
     def __init__(self, log_path, out_prefix, print_to_std):
@@ -95,6 +423,9 @@ class LogManager:
         if self.out_prefix:
             self.out_prefix = self.out_prefix + "_"
         self.print_to_std = print_to_std
+        self.buffer = None   # if a list, messages are collected and only written with flush_log
+        self.running = []   # the buffered logmans of the views that run in parallel, in view order
+        self.lock = threading.Lock()
 
 def run_command(cmd, check = True):
     if check:
@@ -107,34 +438,97 @@ def run_command(cmd, check = True):
         out = subprocess.run(cmd, shell=True, capture_output=True, text=True).stdout.strip("\n")
     return out
 
-def try_execute_sql(sql, errorlog, sqlman, logman, exit_on_fail = True, always_execute = False):
+def try_execute_sql(sql, errorlog, sqlman, logman, exit_on_fail = True, always_execute = False, errors = None):
     succeeded = True
     out = ""
     try:
         if sqlman.log:
             log(sql, logman)
         if sqlman.execute or always_execute:
-            sql = sqlman.hdbsql_jAaxU + " \""+sql+"\""
-            out = subprocess.run(sql, shell=True, capture_output=True, text=True, check=True).stdout.strip("\n")
-    except subprocess.CalledProcessError as e:
-        errorMessage = "ERROR: Could not execute\n\t"+sql+"\nERROR MESSAGE:\n"+e.stderr+"\n"+errorlog
+            out = sqlman.run(sql)
+    except (subprocess.CalledProcessError, SQLExecutionError) as e:
+        error = e.stderr if isinstance(e, subprocess.CalledProcessError) else str(e)
+        errorMessage = "ERROR: Could not execute\n\t"+sql+"\nERROR MESSAGE:\n"+error+"\n"+errorlog
         succeeded = False
+        if errors is not None:
+            errors.append(error)
         if exit_on_fail:
             log(errorMessage, logman)
-            os._exit(1)
+            exit_on_error(sqlman, logman)
         else:
             log(errorMessage, logman)
     return [out, succeeded]
 
+def run_exit_sqls(sqlman, logman):
+    # the statements that restore what the run changed, e.g. auto merge
+    exit_sqls = sqlman.exit_sqls
+    sqlman.exit_sqls = []
+    for sql in exit_sqls:
+        log("Will now execute "+sql+" before exiting", logman)
+        try_execute_sql(sql, "ERROR: Could not execute "+sql+" before exiting", sqlman, logman, False)
+
+def stop_run(sqlman, logman):
+    # only one thread stops the run, i.e. kills all statements and executes the exit statements, returns False in all others
+    if sqlman.stopping_thread is threading.current_thread():
+        return True
+    if not sqlman.exit_lock.acquire(blocking = False):
+        return False
+    sqlman.stop()
+    flush_running_logs(logman)
+    flush_log(logman)
+    sqlman.kill()
+    return True
+
+def exit_on_error(sqlman, logman):
+    if not stop_run(sqlman, logman):
+        # another thread is stopping the run and exits the process
+        if threading.current_thread() is threading.main_thread():
+            threading.Event().wait()
+        sys.exit(1)   # only ends this thread
+    run_exit_sqls(sqlman, logman)
+    if sqlman.metman:
+        close_metrics(sqlman.metman)
+    flush_log(logman)
+    os._exit(1)
+
+def exit_on_sigterm(sqlman, logman):
+    flush_running_logs(logman)
+    log("ERROR: The run received SIGTERM and will stop", logman)
+    exit_on_error(sqlman, logman)
+
 def log(message, logmanager):
-    if logmanager.print_to_std:
-        print(message)
-    if logmanager.path:
-        file_name = "hanaexpimplog"
-        logfile = open(logmanager.path+"/"+file_name+"_"+logmanager.out_prefix+datetime.now().strftime("%Y-%m-%d"+".txt").replace(" ", "_"), "a")
-        logfile.write(message+"\n")   
-        logfile.flush()
-        logfile.close()
+    if logmanager.buffer is not None:
+        logmanager.buffer.append(message)
+        return
+    with logmanager.lock:
+        if logmanager.print_to_std:
+            print(message)
+        if logmanager.path:
+            file_name = "hanaexpimplog"
+            logfile = open(logmanager.path+"/"+file_name+"_"+logmanager.out_prefix+datetime.now().strftime("%Y-%m-%d"+".txt").replace(" ", "_"), "a")
+            logfile.write(message+"\n")   
+            logfile.flush()
+            logfile.close()
+
+def get_buffered_logman(logman):
+    buffered_logman = copy.copy(logman)
+    buffered_logman.buffer = []
+    return buffered_logman
+
+def flush_running_logs(logman):
+    # the logs of all views that run in parallel are written in view order, later messages of the other views are
+    # only about their statements being killed, so they are dropped
+    for job_logman in list(logman.running):
+        flush_log(job_logman)
+        if job_logman is not logman:
+            job_logman.buffer = []
+
+def flush_log(logman):
+    if logman.buffer is not None:
+        messages = logman.buffer
+        logman.buffer = None
+        for message in messages:
+            log(message, logman)
 
 def checkAndConvertBooleanFlag(boolean, flagstring, logman = ''):     
     boolean = boolean.lower()
@@ -168,38 +562,838 @@ def get_key_info(dbuserkey, local_host, logman):
         os._exit(1)
     return  [key_hosts, ENV, DATABASE]
 
-def export_view(view_number, view_schema, view_name, view_path, number_views, sleep_time, sqlman, logman):
+def get_used_memory_percent(sqlman, logman):
+    sql = ("SELECT GREATEST(S.USED, H.USED) FROM "
+           "(SELECT MAX(100.0*TOTAL_MEMORY_USED_SIZE/EFFECTIVE_ALLOCATION_LIMIT) AS USED FROM SYS.M_SERVICE_MEMORY WHERE EFFECTIVE_ALLOCATION_LIMIT > 0) S, "
+           "(SELECT MAX(100.0*INSTANCE_TOTAL_MEMORY_USED_SIZE/ALLOCATION_LIMIT) AS USED FROM SYS.M_HOST_RESOURCE_UTILIZATION WHERE ALLOCATION_LIMIT > 0) H")
+    errorlog = "ERROR: Could not read the used memory from M_SERVICE_MEMORY and M_HOST_RESOURCE_UTILIZATION"
+    [used_memory, succeeded] = try_execute_sql(sql, errorlog, sqlman, logman, True, True)
+    return float(used_memory.strip("\n").strip("|").strip(" "))
+
+def pace(view_number, number_views, next_task, sleepman, sqlman, logman):
+    if int(view_number) >= int(number_views):
+        return 0
+    if not sleepman.memory_threshold:
+        log("Will now sleep for "+str(sleepman.sleep_time)+" seconds before "+next_task, logman)
+        time.sleep(sleepman.sleep_time)
+        return sleepman.sleep_time
+    start_time = time.time()
+    poll_interval = sleepman.poll_interval
+    while True:
+        used_memory = get_used_memory_percent(sqlman, logman)
+        waited = time.time() - start_time
+        if used_memory < sleepman.memory_threshold:
+            log("Used memory is "+str(round(used_memory, 1))+"% < "+str(sleepman.memory_threshold)+"%, waited "+str(round(waited))+" seconds before "+next_task, logman)
+            return waited
+        if waited >= sleepman.max_wait:
+            log("WARNING: Used memory is still "+str(round(used_memory, 1))+"% >= "+str(sleepman.memory_threshold)+"% after the max wait of "+str(sleepman.max_wait)+" seconds, will continue with "+next_task, logman)
+            return waited
+        poll_interval = min(poll_interval, sleepman.max_wait - waited)
+        log("Used memory is "+str(round(used_memory, 1))+"% >= "+str(sleepman.memory_threshold)+"%, will wait "+str(round(poll_interval))+" seconds before checking again", logman)
+        time.sleep(poll_interval)
+        poll_interval = min(2*poll_interval, sleepman.max_poll_interval)
+
+def get_manifest_file_name(view_name, view_path):
+    manifest_file_name = view_path+"hanaexpimp_manifest_"+view_name+".json"
+    return manifest_file_name
+
+def get_view_manifest(view_number, manman):
+    with manman.lock:
+        return dict(manman.manifest["views"].get(str(view_number), {}))
+
+def update_manifest(view_number, manman, **view_fields):
+    # the manifest is written to a temporary file that then replaces the old one, so it is never half written
+    if not manman.enabled:
+        return
+    with manman.lock:
+        if view_number is None:
+            manman.manifest.update(view_fields)
+        else:
+            manman.manifest["views"].setdefault(str(view_number), {}).update(view_fields)
+        with open(manman.file_name+".tmp", "w") as manifest_file:
+            json.dump(manman.manifest, manifest_file, indent = 2, sort_keys = True)
+        os.replace(manman.file_name+".tmp", manman.file_name)
+
+def is_exported(view_manifest, csv_file_name):
+    if view_manifest.get("compressed_size") is not None:
+        [csv_file_name, file_size] = [csv_file_name+".gz", view_manifest.get("compressed_size")]
+    else:
+        file_size = view_manifest.get("csv_size")
+    return view_manifest.get("export_status") == "done" and os.path.exists(csv_file_name) and os.path.getsize(csv_file_name) == file_size
+
+def get_mb_per_second(number_bytes, seconds):
+    return str(round(number_bytes/1024/1024/max(seconds, 0.001), 1))+" MB/s"
+
+def compress_csv(csv_file_name, stageman, block_size = 16*1024*1024):
+    # compresses the csv file to <csv file>.gz and removes the csv file, the rows are counted in the same pass
+    counter = CSVRowCounter()
+    with open(csv_file_name, "rb") as csv_file:
+        with gzip.open(csv_file_name+".gz.tmp", "wb", compresslevel = stageman.compression_level) as gz_file:
+            block = csv_file.read(block_size)
+            while block:
+                counter.update(block)
+                gz_file.write(block)
+                block = csv_file.read(block_size)
+    os.replace(csv_file_name+".gz.tmp", csv_file_name+".gz")
+    os.remove(csv_file_name)
+    return counter
+
+def decompress_to_fifo(gz_file_name, fifo_name, counter, errors, block_size = 16*1024*1024):
+    # runs in its own thread, opening the fifo blocks until IMPORT opens it for reading
+    try:
+        with open(fifo_name, "wb") as fifo:
+            with gzip.open(gz_file_name, "rb") as gz_file:
+                block = gz_file.read(block_size)
+                while block:
+                    counter.update(block)
+                    fifo.write(block)
+                    block = gz_file.read(block_size)
+    except BaseException as e:
+        errors.append(e)
+
+def get_fifo_name(gz_file_name):
+    # exported_<view>_<n>[_<part>].csv.gz --> fifo_<view>_<n>[_<part>].csv in the same folder
+    folder, file_name = os.path.split(gz_file_name[:-len(".gz")])
+    return os.path.join(folder, "fifo_"+file_name[len("exported_"):] if file_name.startswith("exported_") else "fifo_"+file_name)
+
+def import_csv_file(csv_file_name, rows, full_table_name, impman, exit_on_fail, sqlman, logman, errors = None):
+    # a .csv.gz file is decompressed into a fifo that IMPORT reads from, so its uncompressed data is never written to disk
+    through_pipe = csv_file_name.endswith(".gz")
+    import_file_name = get_fifo_name(csv_file_name) if through_pipe else csv_file_name
+    sql_for_import = "IMPORT FROM CSV FILE '"+import_file_name+"' INTO "+full_table_name+get_import_options(impman, through_pipe)
+    errorlog = "ERROR: Could not import data from "+csv_file_name+" into "+full_table_name
+    if not through_pipe or not sqlman.execute:
+        return try_execute_sql(sql_for_import, errorlog, sqlman, logman, exit_on_fail, False, errors)
+    if os.path.exists(import_file_name):
+        os.remove(import_file_name)
+    os.mkfifo(import_file_name)
+    start_time = time.time()
+    fifo_counter = CSVRowCounter()
+    fifo_errors = []
+    fifo_writer = threading.Thread(target = decompress_to_fifo, args = (csv_file_name, import_file_name, fifo_counter, fifo_errors), daemon = True)
+    fifo_writer.start()
+    [out, succeeded] = try_execute_sql(sql_for_import, errorlog, sqlman, logman, exit_on_fail, False, errors)
+    if not succeeded:
+        # unblocks the writer if IMPORT never opened the fifo
+        os.close(os.open(import_file_name, os.O_RDONLY | os.O_NONBLOCK))
+    fifo_writer.join()
+    os.remove(import_file_name)
+    if succeeded and (fifo_errors or fifo_counter.get_rows() != rows):
+        log("ERROR: Could not stream "+csv_file_name+" through "+import_file_name+" ("+str(fifo_counter.get_rows())+" of "+str(rows)+" rows) "+" ".join(str(e) for e in fifo_errors), logman)
+        exit_on_error(sqlman, logman)
+    import_seconds = time.time() - start_time
+    if succeeded:
+        log("Decompressed "+str(round(fifo_counter.size/1024/1024, 1))+" MB from "+csv_file_name+" into the import in "+str(round(import_seconds, 1))+" seconds ("+get_mb_per_second(fifo_counter.size, import_seconds)+")", logman)
+    return [out, succeeded]
+
+VIEW_METRICS = [["seconds", "Wall time of the EXPORT or IMPORT statement of the view"],
+                ["bytes", "Size of the csv file of the view"],
+                ["rows", "Number of rows of the view"],
+                ["rows_per_second", "Rows per second of the statement"],
+                ["mb_per_second", "MB per second of the statement"],
+                ["wait_seconds", "Time slept or waited for memory after the statement"],
+                ["peak_memory_percent", "Peak used memory in percent of the allocation limit during the statement"]]
+
+def record_metrics(view_number, task, metman, seconds, number_bytes, rows, wait_seconds, peak_memory_percent):
+    if not metman.enabled:
+        return
+    metman.queue.put({"time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "view_name": metman.view_name, "view": view_number, "task": task,
+                      "seconds": round(seconds, 3), "bytes": number_bytes, "rows": rows, "rows_per_second": round(rows/max(seconds, 0.001), 1),
+                      "mb_per_second": round(number_bytes/1024/1024/max(seconds, 0.001), 1), "wait_seconds": round(wait_seconds, 3), "peak_memory_percent": round(peak_memory_percent, 1)})
+
+def write_metrics(metman):
+    # whatever is queued is written at once, the textfile is replaced atomically as the node exporter may read it any time
+    closed = False
+    while not closed:
+        records = [metman.queue.get()]
+        while not metman.queue.empty():
+            records.append(metman.queue.get())
+        closed = None in records
+        records = [record for record in records if record is not None]
+        if not records:
+            continue
+        with open(metman.json_file_name, "a") as json_file:
+            json_file.write("".join(json.dumps(record)+"\n" for record in records))
+        for record in records:
+            metman.latest[(record["task"], record["view"])] = record
+        lines = []
+        for [name, description] in VIEW_METRICS:
+            lines.append("# HELP hanaexpimp_view_"+name+" "+description)
+            lines.append("# TYPE hanaexpimp_view_"+name+" gauge")
+            for [task, view_number] in sorted(metman.latest):
+                lines.append("hanaexpimp_view_"+name+"{view_name=\""+metman.view_name+"\",view=\""+str(view_number)+"\",task=\""+task+"\"} "+str(metman.latest[(task, view_number)][name]))
+        with open(metman.prom_file_name+".tmp", "w") as prom_file:
+            prom_file.write("\n".join(lines)+"\n")
+        os.replace(metman.prom_file_name+".tmp", metman.prom_file_name)
+
+def close_metrics(metman):
+    if metman.enabled:
+        metman.enabled = False
+        metman.queue.put(None)
+        metman.thread.join()
+
+def export_view(view_number, view_schema, view_name, view_path, number_views, bisectman, stageman, manman, metman, sleepman, sqlman, logman):
+    csv_file_name = get_csv_file_name(view_number, view_name, view_path)
+    view_manifest = get_view_manifest(view_number, manman)
+    if manman.resume and is_exported(view_manifest, csv_file_name):
+        log("Skipping "+view_name+"_"+str(view_number)+", it was already exported to "+get_staged_file_name(view_number, view_name, view_path)+" with "+str(view_manifest["rows"])+" rows", logman)
+        return view_manifest["rows"]
+    update_manifest(view_number, manman, export_status = "started", export_start = datetime.now().strftime("%Y-%m-%d %H:%M:%S"), import_status = None)
+    start_time = time.time()
     sql_for_export = "EXPORT INTO '"+view_path+"exported_"+view_name+"_"+str(view_number)+".csv' FROM "+view_schema+"."+view_name+"_"+str(view_number)
     log("Will now export "+view_name+"_"+str(view_number)+" to "+view_path+"exported_"+view_name+"_"+str(view_number)+".csv", logman)
     errorlog = "ERROR: Could not export "+view_name+"_"+str(view_number)+" to "+view_path+"exported_"+view_name+"_"+str(view_number)+".csv"
-    try_execute_sql(sql_for_export, errorlog, sqlman, logman) 
-    nbrRows = run_command("cat "+view_path+"exported_"+view_name+"_"+str(view_number)+".csv|wc -l")
-    log("Number of rows in "+view_path+"exported_"+view_name+"_"+str(view_number)+".csv is now "+nbrRows, logman)
-    if int(view_number) < int(number_views):
-        log("Will now sleep for "+sleep_time+" seconds before exporting next view", logman)
-    time.sleep(int(sleep_time))
-    return int(nbrRows)
+    errors = []
+    if metman.enabled and sqlman.execute:
+        sampler = MemorySampler(sqlman, logman).start()
+    [out, succeeded] = try_execute_sql(sql_for_export, errorlog, sqlman, logman, not bisectman.enabled, False, errors)
+    if not succeeded:
+        if not is_memory_error(errors[0]):
+            exit_on_error(sqlman, logman)
+        log("The export of "+view_name+"_"+str(view_number)+" failed on memory, will now split it on "+bisectman.partition_column, logman)
+        splits = []
+        data_type = get_column_data_type(view_schema, view_name+"_"+str(view_number), bisectman.partition_column, sqlman, logman)
+        export_bisected(view_schema+"."+view_name+"_"+str(view_number), csv_file_name, 1, data_type, bisectman, sqlman, logman, splits)
+        log("The export of "+view_name+"_"+str(view_number)+" was split into "+str(len(splits))+" views: "+"; ".join(splits), logman)
+        update_manifest(view_number, manman, export_splits = splits)
+    nbrRows = 0
+    if sqlman.execute:
+        export_seconds = time.time() - start_time
+        peak_memory = sampler.stop() if metman.enabled else 0.0
+        csv_size = os.path.getsize(csv_file_name)
+        log("The export wrote "+str(round(csv_size/1024/1024, 1))+" MB in "+str(round(export_seconds, 1))+" seconds ("+get_mb_per_second(csv_size, export_seconds)+")", logman)
+        compressed_size = None
+        if stageman.compress:
+            start_time = time.time()
+            counter = compress_csv(csv_file_name, stageman)
+            [nbrRows, checksum] = [counter.get_rows(), counter.get_checksum()]
+            compressed_size = os.path.getsize(csv_file_name+".gz")
+            log("Compressed "+csv_file_name+" to "+csv_file_name+".gz, ratio "+str(round(csv_size/max(compressed_size, 1), 1))+", in "+str(round(time.time() - start_time, 1))+" seconds ("+get_mb_per_second(csv_size, time.time() - start_time)+")", logman)
+        else:
+            [nbrRows, checksum] = count_csv_rows(csv_file_name)
+        log("Number of rows in "+view_path+"exported_"+view_name+"_"+str(view_number)+".csv is now "+str(nbrRows)+" (crc32 "+checksum+")", logman)
+        update_manifest(view_number, manman, export_status = "done", export_seconds = round(export_seconds, 3), csv_size = csv_size, compressed_size = compressed_size, rows = nbrRows, checksum = checksum)
+    waited = pace(view_number, number_views, "exporting next view", sleepman, sqlman, logman)
+    if sqlman.execute:
+        record_metrics(view_number, "export", metman, export_seconds, csv_size, nbrRows, waited, peak_memory)
+    return nbrRows
+
+def is_over_memory_budget(view_number, memory_budget, sleepman, sqlman, logman):
+    used_memory = get_used_memory_percent(sqlman, logman)
+    if used_memory >= memory_budget:
+        log("Used memory is "+str(round(used_memory, 1))+"% >= memory budget "+str(memory_budget)+"%, will not start view "+str(view_number)+" before the memory is checked again in "+str(sleepman.poll_interval)+" seconds", logman)
+        return True
+    return False
+
+def run_views(task, view_numbers, parallel, memory_budget, sleepman, sqlman, logman):
+    # runs task(view_number, logman) for all views, with parallel > 1 up to parallel views at the same time,
+    # the log of each view is buffered and written in view order, so the log looks as in the sequential case
+    if parallel <= 1:
+        results = []
+        for view_number in view_numbers:
+            while memory_budget and results and is_over_memory_budget(view_number, memory_budget, sleepman, sqlman, logman):
+                time.sleep(sleepman.poll_interval)
+            results.append(task(view_number, logman))
+        return results
+    results = []
+    running = []   # [view_number, future, buffered logman] in view order, also the finished views whose log is not written yet
+    executor = ThreadPoolExecutor(max_workers = parallel)
+    try:
+        view_numbers = list(view_numbers)
+        while view_numbers or running:
+            active = [future for [view_number, future, job_logman] in running if not future.done()]   # a slow view must not keep the finished ones from freeing their slots
+            while view_numbers and len(active) < parallel:
+                if memory_budget and active and is_over_memory_budget(view_numbers[0], memory_budget, sleepman, sqlman, logman):
+                    break
+                job_logman = get_buffered_logman(logman)
+                logman.running.append(job_logman)
+                running.append([view_numbers[0], executor.submit(task, view_numbers[0], job_logman), job_logman])
+                active.append(running[-1][1])
+                view_numbers.pop(0)
+            if active:
+                concurrent.futures.wait(active, timeout = sleepman.poll_interval if view_numbers else None, return_when = concurrent.futures.FIRST_COMPLETED)
+            while running and running[0][1].done():
+                results.append(running[0][1].result())
+                flush_log(running[0][2])
+                logman.running.remove(running[0][2])
+                running.pop(0)
+    except BaseException:
+        for [view_number, future, job_logman] in running:
+            future.cancel()
+        stop_run(sqlman, logman)   # else the shutdown would wait for the statements of the running views
+        raise
+    finally:
+        executor.shutdown(wait = True, cancel_futures = True)
+    return results
+
+def count_csv_rows(csv_file_name, block_size = 16*1024*1024):
+    counter = CSVRowCounter()
+    with (gzip.open(csv_file_name, "rb") if csv_file_name.endswith(".gz") else open(csv_file_name, "rb")) as csv_file:
+        block = csv_file.read(block_size)
+        while block:
+            counter.update(block)
+            block = csv_file.read(block_size)
+    return [counter.get_rows(), counter.get_checksum()]
+
+def run_pipeline(export_task, import_task, view_numbers, max_staged_files, view_name, view_path, manman, sqlman, logman):
+    # the views are exported in a background thread and imported in this thread, at most max_staged_files csv files exist at
+    # the same time, a csv file is deleted after its import is verified, a kept csv file keeps its staging slot
+    staged_files = threading.Semaphore(max_staged_files)
+    exported_views = queue.Queue()
+    def export_all():
+        try:
+            for view_number in view_numbers:
+                staged_files.acquire()
+                export_task(view_number, logman)
+                exported_views.put([view_number, None])
+        except BaseException as e:
+            exported_views.put([None, e])
+    exporter = threading.Thread(target = export_all, daemon = True)
+    exporter.start()
+    kept_files = []
+    for i in range(len(view_numbers)):
+        [view_number, error] = exported_views.get()
+        if error is not None:
+            raise error
+        csv_file_name = get_staged_file_name(view_number, view_name, view_path)
+        verified = import_task(view_number, logman)
+        if verified and os.path.exists(csv_file_name):
+            os.remove(csv_file_name)
+            update_manifest(view_number, manman, csv_deleted = True)
+            log("Deleted "+csv_file_name+" since its import is verified", logman)
+        elif os.path.exists(csv_file_name):
+            log("WARNING: The import of "+csv_file_name+" could not be verified, so it is kept", logman)
+            kept_files.append(csv_file_name)
+            if len(kept_files) >= max_staged_files and i < len(view_numbers) - 1:
+                log("ERROR: All "+str(max_staged_files)+" staged csv files (-msf) are kept since their imports could not be verified, so no further view can be exported: "+", ".join(kept_files), logman)
+                exit_on_error(sqlman, logman)
+            continue
+        staged_files.release()
+    exporter.join()
 
 def get_csv_file_name(view_number, view_name, view_path):
     csv_file_name = view_path+"exported_"+view_name+"_"+str(view_number)+".csv"
     return csv_file_name
 
+def get_staged_file_name(view_number, view_name, view_path):
+    # the exported file is either the csv file or, if it was compressed, the csv file with .gz
+    csv_file_name = get_csv_file_name(view_number, view_name, view_path)
+    if not os.path.exists(csv_file_name) and os.path.exists(csv_file_name+".gz"):
+        return csv_file_name+".gz"
+    return csv_file_name
+
 def get_full_table_name(table_schema, table_name):
     full_table_name = "\\\""+table_schema+"\\\".\\\""+table_name+"\\\""
     return full_table_name
 
-def import_view(view_number, view_name, view_path, table_schema, table_name, number_views, sleep_time, sqlman, logman):
-    csv_file_name = get_csv_file_name(view_number, view_name, view_path)
+def import_view(view_number, view_name, view_path, table_schema, table_name, number_views, exact_count, impman, mergeman, bisectman, rowman, manman, metman, sleepman, sqlman, logman):
+    csv_file_name = get_staged_file_name(view_number, view_name, view_path)
     full_table_name = get_full_table_name(table_schema, table_name)
-    sql_for_import = "IMPORT FROM CSV FILE '"+csv_file_name+"' INTO "+full_table_name
-    log("Will now import all data from "+csv_file_name+" into "+full_table_name, logman)
-    errorlog = "ERROR: Could not import data from "+csv_file_name+" into "+full_table_name
-    try_execute_sql(sql_for_import, errorlog, sqlman, logman) 
-    count_out = number_of_rows_in_table(table_schema, table_name, sqlman, logman)
-    log("Number of rows in "+full_table_name+" is now "+str(count_out), logman)
-    if int(view_number) < int(number_views):
-        log("Will now sleep for "+sleep_time+" seconds before importing data next csv file", logman)
-    time.sleep(int(sleep_time))
+    view_manifest = get_view_manifest(view_number, manman)
+    if manman.resume and view_manifest.get("import_status") == "done":
+        log("Skipping "+csv_file_name+", it was already imported into "+full_table_name, logman)
+        return False
+    nbrRows = 0
+    if sqlman.execute:
+        if not os.path.exists(csv_file_name):
+            log("ERROR: "+csv_file_name+" (or "+csv_file_name+".gz) does not exist, please export "+view_name+"_"+str(view_number)+" first", logman)
+            exit_on_error(sqlman, logman)
+        if is_exported(view_manifest, get_csv_file_name(view_number, view_name, view_path)):
+            nbrRows = view_manifest["rows"]   # counted by the export
+        else:
+            [nbrRows, checksum] = count_csv_rows(csv_file_name)
+            update_manifest(view_number, manman, rows = nbrRows, checksum = checksum)
+    update_manifest(view_number, manman, import_status = "started", import_start = datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    if metman.enabled and sqlman.execute:
+        sampler = MemorySampler(sqlman, logman).start()
+    start_time = time.time()
+    log("Will now import all data from "+csv_file_name+" ("+str(nbrRows)+" rows) into "+full_table_name, logman)
+    with impman.lock:
+        tuning = impman.auto_tune and sqlman.execute and not impman.tuning_started
+        impman.tuning_started = impman.tuning_started or tuning
+    if tuning:
+        auto_tune_import(csv_file_name, nbrRows, table_schema, table_name, impman, sleepman, sqlman, logman)
+        impman.tuned.set()
+        succeeded = True
+    else:
+        impman.tuned.wait()
+        errors = []
+        [out, succeeded] = import_csv_file(csv_file_name, nbrRows, full_table_name, impman, not bisectman.enabled, sqlman, logman, errors)
+    if not succeeded:
+        with rowman.lock:
+            rows_before = rowman.expected_rows
+        if is_memory_error(errors[0]) and not rowman.check_each_import:
+            log("ERROR: "+csv_file_name+" is not split, with -par > 1 the other views import at the same time, so it cannot be checked that none of its rows were imported", logman)
+            exit_on_error(sqlman, logman)
+        if not is_memory_error(errors[0]) or record_count_of_table(table_schema, table_name, sqlman, logman) != rows_before:
+            exit_on_error(sqlman, logman)
+        log("The import of "+csv_file_name+" failed on memory and no rows were imported, will now split it", logman)
+        splits = []
+        import_bisected(csv_file_name, nbrRows, rows_before, 1, table_schema, table_name, impman, bisectman, sqlman, logman, splits)
+        log("The import of "+csv_file_name+" was split into "+str(len(splits))+" files: "+"; ".join(splits), logman)
+        update_manifest(view_number, manman, import_splits = splits)
+    import_seconds = time.time() - start_time
+    peak_memory = sampler.stop() if metman.enabled and sqlman.execute else 0.0
+    update_manifest(view_number, manman, import_status = "done", import_seconds = round(import_seconds, 3))
+    if mergeman.enabled:
+        merge_delta_if_due(table_schema, table_name, mergeman, sqlman, logman)
+    with rowman.lock:
+        rowman.expected_rows += nbrRows
+        expected_rows = rowman.expected_rows
+    if exact_count:
+        count_out = number_of_rows_in_table(table_schema, table_name, sqlman, logman)
+        log("Number of rows in "+full_table_name+" is now "+str(count_out), logman)
+    else:
+        count_out = record_count_of_table(table_schema, table_name, sqlman, logman)
+        log("Number of rows in "+full_table_name+" is now "+str(count_out)+" (M_TABLES.RECORD_COUNT)", logman)
+    verified = rowman.check_each_import and sqlman.execute and count_out == expected_rows
+    if rowman.check_each_import and sqlman.execute and count_out != expected_rows:
+        log("WARNING: "+str(expected_rows)+" rows were expected in "+full_table_name+" after importing "+csv_file_name+", but there are "+str(count_out), logman)
+    waited = pace(view_number, number_views, "importing data next csv file", sleepman, sqlman, logman)
+    if sqlman.execute:
+        record_metrics(view_number, "import", metman, import_seconds, view_manifest.get("csv_size") or os.path.getsize(csv_file_name), nbrRows, waited, peak_memory)
+    return verified
+
+def check_partly_imported_views(view_numbers, table_rows, manman, logman):
+    # compares the rows in the table now with the rows before the first import and the rows of the views imported since then,
+    # started imports are either not imported at all (imported again), fully imported (marked done) or else the run stops
+    started_views = [view_number for view_number in view_numbers if get_view_manifest(view_number, manman).get("import_status") == "started"]
+    if not started_views:
+        return
+    done_rows = sum(get_view_manifest(view_number, manman).get("rows", 0) for view_number in view_numbers if get_view_manifest(view_number, manman).get("import_status") == "done")
+    started_rows = sum(get_view_manifest(view_number, manman).get("rows", 0) for view_number in started_views)
+    extra_rows = table_rows - manman.manifest["table_rows_before_import"] - done_rows
+    started_views_string = ", ".join(str(view_number) for view_number in started_views)
+    if extra_rows == 0:
+        log("The import of view(s) "+started_views_string+" was started but no rows were imported, they will be imported again", logman)
+        for view_number in started_views:
+            update_manifest(view_number, manman, import_status = None)
+    elif extra_rows == started_rows:
+        log("The import of view(s) "+started_views_string+" was started and all their "+str(started_rows)+" rows are in the table, they are marked as imported", logman)
+        for view_number in started_views:
+            update_manifest(view_number, manman, import_status = "done")
+    else:
+        log("ERROR: The import of view(s) "+started_views_string+" was started and "+str(extra_rows)+" of their "+str(started_rows)+" rows are in the table. Please delete these rows before resuming.", logman)
+        os._exit(1)
+
+def is_memory_error(error):
+    return re.search("cannot allocate enough memory|allocation failed|out of memory", error, re.IGNORECASE) is not None
+
+def get_column_data_type(schema, object_name, column_name, sqlman, logman):
+    # object_name can be a table or a view
+    sql = ("SELECT DATA_TYPE_NAME FROM SYS.TABLE_COLUMNS WHERE SCHEMA_NAME = '"+schema+"' AND TABLE_NAME = '"+object_name+"' AND COLUMN_NAME = '"+column_name+"' "
+           "UNION ALL SELECT DATA_TYPE_NAME FROM SYS.VIEW_COLUMNS WHERE SCHEMA_NAME = '"+schema+"' AND VIEW_NAME = '"+object_name+"' AND COLUMN_NAME = '"+column_name+"'")
+    [data_type, succeeded] = try_execute_sql(sql, "ERROR: Could not read the data type of "+column_name, sqlman, logman, True, True)
+    data_type = data_type.split("\n")[0].strip("|").strip(" ")
+    if not data_type:
+        log("INPUT ERROR: The column "+column_name+" does not exist in "+schema+"."+object_name+". Please see --help for more information.", logman)
+        exit_on_error(sqlman, logman)
+    return data_type
+
+def export_bisected(source, csv_file_name, depth, data_type, bisectman, sqlman, logman, splits):
+    # splits source on the median of a sample of the partition column into two temporary views and exports them into csv_file_name
+    column = "\\\""+bisectman.partition_column+"\\\""
+    sample_clause = "WHERE "+column+" IS NOT NULL AND RAND() < "+str(bisectman.sample_percent/100.0)
+    [quantiles, sample_size] = get_sample_quantiles(column, source, sample_clause, 2, "ERROR: Could not sample "+source, sqlman, logman)
+    boundaries = [get_quoted_value(value, data_type) for value in get_partition_boundaries(quantiles, sample_size, 2)] if sample_size else []
+    if not boundaries:
+        log("ERROR: "+source+" cannot be split on "+bisectman.partition_column+", the sample has too few distinct values", logman)
+        exit_on_error(sqlman, logman)
+    with open(csv_file_name, "wb"):
+        pass
+    for view_index in range(2):
+        sub_view = source+"_"+str(view_index+1)
+        condition = get_view_condition(column, boundaries, view_index)
+        part_file_name = csv_file_name[:-len(".csv")]+"_"+str(view_index+1)+".csv"
+        log("Will now create the temporary view "+sub_view+" with "+condition.replace("\\\"", "\"")+" and export it to "+part_file_name, logman)
+        try_execute_sql("CREATE VIEW "+sub_view+" AS SELECT * FROM "+source+" WHERE "+condition, "ERROR: Could not create the temporary view "+sub_view, sqlman, logman)
+        sqlman.exit_sqls.insert(0, "DROP VIEW "+sub_view)   # views created later are dropped first, they can depend on this one
+        errors = []
+        errorlog = "ERROR: Could not export "+sub_view+" to "+part_file_name
+        [out, succeeded] = try_execute_sql("EXPORT INTO '"+part_file_name+"' FROM "+sub_view, errorlog, sqlman, logman, False, False, errors)
+        if not succeeded:
+            if depth >= bisectman.max_depth or not is_memory_error(errors[0]):
+                exit_on_error(sqlman, logman)
+            log(sub_view+" failed on memory, will now split it further", logman)
+            export_bisected(sub_view, part_file_name, depth+1, data_type, bisectman, sqlman, logman, splits)
+        else:
+            splits.append(sub_view+": "+condition.replace("\\\"", "\""))
+        with open(csv_file_name, "ab") as csv_file:
+            with open(part_file_name, "rb") as part_file:
+                shutil.copyfileobj(part_file, csv_file, 16*1024*1024)
+        os.remove(part_file_name)
+        try_execute_sql("DROP VIEW "+sub_view, "ERROR: Could not drop the temporary view "+sub_view, sqlman, logman, False)
+        sqlman.exit_sqls.remove("DROP VIEW "+sub_view)
+
+def open_part_file(part_file_name):
+    # the parts of a .csv.gz file are compressed as well, with the fastest level since they are removed after their import
+    return gzip.open(part_file_name, "wb", compresslevel = 1) if part_file_name.endswith(".gz") else open(part_file_name, "wb")
+
+def split_csv_file(csv_file_name, part_file_names, rows):
+    # splits a csv file, possibly compressed, into csv files with about the same number of rows, quoted newlines stay in their row,
+    # every part file is written, a part only gets no rows if the csv file has fewer rows than parts
+    number_parts = len(part_file_names)
+    part_ends = [(rows*(part_index+1) + number_parts - 1)//number_parts for part_index in range(number_parts)]
+    part_rows = [0 for part_file_name in part_file_names]
+    written_rows = 0
+    in_quote = False
+    part_index = 0
+    part_file = open_part_file(part_file_names[0])
+    with (gzip.open(csv_file_name, "rb") if csv_file_name.endswith(".gz") else open(csv_file_name, "rb")) as csv_file:
+        for line in csv_file:
+            while not in_quote and written_rows >= part_ends[part_index] and part_index < number_parts - 1:
+                part_file.close()
+                part_index += 1
+                part_file = open_part_file(part_file_names[part_index])
+            part_file.write(line)
+            if line.count(b'"') % 2:
+                in_quote = not in_quote
+            if not in_quote:
+                part_rows[part_index] += 1
+                written_rows += 1
+    part_file.close()
+    for part_file_name in part_file_names[part_index+1:]:
+        open_part_file(part_file_name).close()
+    return part_rows
+
+def get_delta_size_mb(table_schema, table_name, sqlman, logman):
+    sql = "SELECT SUM(MEMORY_SIZE_IN_DELTA) FROM SYS.M_CS_TABLES WHERE SCHEMA_NAME = '"+table_schema+"' AND TABLE_NAME = '"+table_name+"'"
+    [delta_size, succeeded] = try_execute_sql(sql, "ERROR: Could not read the delta size of "+get_full_table_name(table_schema, table_name), sqlman, logman, True, True)
+    delta_size = delta_size.strip("\n").strip("|").strip(" ")
+    return float(delta_size)/1024/1024 if is_integer(delta_size) else 0.0
+
+def merge_delta(table_schema, table_name, delta_size, reason, sqlman, logman):
+    full_table_name = get_full_table_name(table_schema, table_name)
+    log("Will now merge the delta of "+full_table_name+" ("+str(round(delta_size, 1))+" MB) "+reason, logman)
+    start_time = time.time()
+    try_execute_sql("MERGE DELTA OF "+full_table_name, "ERROR: Could not merge the delta of "+full_table_name, sqlman, logman)
+    log("The delta merge of "+full_table_name+" took "+str(round(time.time() - start_time, 1))+" seconds", logman)
+
+def disable_auto_merge(table_schema, table_name, mergeman, sqlman, logman):
+    full_table_name = get_full_table_name(table_schema, table_name)
+    sql = "SELECT AUTO_MERGE_ON FROM SYS.TABLES WHERE SCHEMA_NAME = '"+table_schema+"' AND TABLE_NAME = '"+table_name+"'"
+    [auto_merge_on, succeeded] = try_execute_sql(sql, "ERROR: Could not read the auto merge setting of "+full_table_name, sqlman, logman, True, True)
+    mergeman.auto_merge_on = auto_merge_on.strip("\n").strip("|").strip(" ").upper() == "TRUE"
+    log("Auto merge of "+full_table_name+" is "+("on" if mergeman.auto_merge_on else "off")+(", will now disable it during the import" if mergeman.auto_merge_on else ""), logman)
+    if mergeman.auto_merge_on:
+        try_execute_sql("ALTER TABLE "+full_table_name+" DISABLE AUTOMERGE", "ERROR: Could not disable auto merge of "+full_table_name, sqlman, logman)
+        sqlman.exit_sqls.append("ALTER TABLE "+full_table_name+" ENABLE AUTOMERGE")
+
+def restore_auto_merge(table_schema, table_name, mergeman, sqlman, logman):
+    full_table_name = get_full_table_name(table_schema, table_name)
+    delta_size = get_delta_size_mb(table_schema, table_name, sqlman, logman)
+    if delta_size > 0:
+        merge_delta(table_schema, table_name, delta_size, "after the import", sqlman, logman)
+    if mergeman.auto_merge_on:
+        log("Will now enable auto merge of "+full_table_name+" again", logman)
+        try_execute_sql("ALTER TABLE "+full_table_name+" ENABLE AUTOMERGE", "ERROR: Could not enable auto merge of "+full_table_name, sqlman, logman)
+        sqlman.exit_sqls.remove("ALTER TABLE "+full_table_name+" ENABLE AUTOMERGE")
+
+def merge_delta_if_due(table_schema, table_name, mergeman, sqlman, logman):
+    with mergeman.lock:
+        mergeman.imported_files += 1
+        delta_size = get_delta_size_mb(table_schema, table_name, sqlman, logman)
+        log("The delta of "+get_full_table_name(table_schema, table_name)+" is now "+str(round(delta_size, 1))+" MB", logman)
+        if mergeman.merge_every and mergeman.imported_files % mergeman.merge_every == 0:
+            merge_delta(table_schema, table_name, delta_size, "after "+str(mergeman.imported_files)+" imported csv files", sqlman, logman)
+        elif mergeman.merge_delta_size and delta_size > mergeman.merge_delta_size:
+            merge_delta(table_schema, table_name, delta_size, "since it is larger than "+str(mergeman.merge_delta_size)+" MB", sqlman, logman)
+
+def get_import_options(impman, through_pipe = False):
+    options = ""
+    if impman.threads and not through_pipe:
+        options += " THREADS "+str(impman.threads)
+    if impman.batch:
+        options += " BATCH "+str(impman.batch)
+    if impman.table_lock:
+        options += " TABLE LOCK"
+    return " WITH"+options if options else ""
+
+def auto_tune_import(csv_file_name, rows, table_schema, table_name, impman, sleepman, sqlman, logman):
+    # imports one part of the csv file per candidate and keeps the THREADS and BATCH with the most rows per second
+    full_table_name = get_full_table_name(table_schema, table_name)
+    candidates = impman.candidates[:rows]   # every part needs at least one row
+    if not candidates:
+        log("Auto tune: "+csv_file_name+" has no rows, so the other csv files are imported with -it and -ib", logman)
+        return
+    if len(candidates) < len(impman.candidates):
+        log("Auto tune: "+csv_file_name+" has only "+str(rows)+" rows, so only the first "+str(len(candidates))+" candidates are compared", logman)
+    extension = ".csv.gz" if csv_file_name.endswith(".gz") else ".csv"
+    part_file_names = [csv_file_name[:-len(extension)]+"_tune_"+str(part_index+1)+extension for part_index in range(len(candidates))]
+    part_rows = split_csv_file(csv_file_name, part_file_names, rows)
+    [threads, batch] = [impman.threads, impman.batch]
+    results = []
+    for part_index in range(len(part_file_names)):
+        if not part_rows[part_index]:   # a part without rows says nothing about the rows per second
+            os.remove(part_file_names[part_index])
+            continue
+        [impman.threads, impman.batch] = candidates[part_index]
+        sampler = MemorySampler(sqlman, logman).start()
+        start_time = time.time()
+        import_csv_file(part_file_names[part_index], part_rows[part_index], full_table_name, impman, True, sqlman, logman)
+        seconds = max(time.time() - start_time, 0.001)
+        peak_memory = sampler.stop()
+        os.remove(part_file_names[part_index])
+        results.append([part_rows[part_index]/seconds, peak_memory, impman.threads, impman.batch])
+        log("Auto tune: THREADS "+str(impman.threads)+" BATCH "+str(impman.batch)+" imported "+str(part_rows[part_index])+" rows in "+str(round(seconds, 2))+" seconds ("+str(int(part_rows[part_index]/seconds))+" rows/s), peak used memory "+str(round(peak_memory, 1))+"%", logman)
+    if not results:
+        [impman.threads, impman.batch] = [threads, batch]
+        log("Auto tune: no part of "+csv_file_name+" has rows, so the other csv files are imported with -it and -ib", logman)
+        return
+    allowed_results = [result for result in results if not sleepman.memory_threshold or result[1] < sleepman.memory_threshold]
+    [rows_per_second, peak_memory, impman.threads, impman.batch] = max(allowed_results if allowed_results else results)
+    log("Auto tune: THREADS "+str(impman.threads)+" BATCH "+str(impman.batch)+" will be used for the other csv files", logman)
+
+def import_bisected(csv_file_name, rows, rows_before, depth, table_schema, table_name, impman, bisectman, sqlman, logman, splits):
+    # splits the csv file in two halves and imports them one after the other, a half is only split further if none of its rows were imported
+    full_table_name = get_full_table_name(table_schema, table_name)
+    extension = ".csv.gz" if csv_file_name.endswith(".gz") else ".csv"
+    part_file_names = [csv_file_name[:-len(extension)]+"_"+str(part_index+1)+extension for part_index in range(2)]
+    part_rows = split_csv_file(csv_file_name, part_file_names, rows)
+    for part_index in range(2):
+        if not part_rows[part_index]:
+            os.remove(part_file_names[part_index])
+            continue
+        log("Will now import all data from "+part_file_names[part_index]+" ("+str(part_rows[part_index])+" rows) into "+full_table_name, logman)
+        errors = []
+        [out, succeeded] = import_csv_file(part_file_names[part_index], part_rows[part_index], full_table_name, impman, False, sqlman, logman, errors)
+        if not succeeded:
+            if depth >= bisectman.max_depth or not is_memory_error(errors[0]) or record_count_of_table(table_schema, table_name, sqlman, logman) != rows_before:
+                log("ERROR: "+part_file_names[part_index]+" could not be imported and cannot be split further", logman)
+                exit_on_error(sqlman, logman)
+            log(part_file_names[part_index]+" failed on memory, will now split it further", logman)
+            import_bisected(part_file_names[part_index], part_rows[part_index], rows_before, depth+1, table_schema, table_name, impman, bisectman, sqlman, logman, splits)
+        else:
+            splits.append(part_file_names[part_index]+": "+str(part_rows[part_index])+" rows")
+        rows_before += part_rows[part_index]
+        os.remove(part_file_names[part_index])
+
+def is_valid_value(value, data_type):
+    if data_type in ("TINYINT", "SMALLINT", "INTEGER", "BIGINT"):
+        return re.match(r"^[-+]?[0-9]+$", value) is not None
+    if data_type in ("DECIMAL", "SMALLDECIMAL", "REAL", "DOUBLE", "FLOAT"):
+        return re.match(r"^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?$", value) is not None
+    if data_type == "DATE":
+        return re.match(r"^[0-9]{4}-[0-9]{2}-[0-9]{2}$", value) is not None
+    if data_type == "TIME":
+        return re.match(r"^[0-9]{2}:[0-9]{2}:[0-9]{2}$", value) is not None
+    if data_type in ("TIMESTAMP", "SECONDDATE"):
+        return re.match(r"^[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}(\.[0-9]+)?$", value) is not None
+    return True
+
+def validate_csv_row(row, data_types):
+    # returns why the row is bad, or an empty string if it is fine
+    try:
+        row = row.decode("utf-8")
+    except UnicodeDecodeError:
+        return "not valid UTF-8"
+    try:
+        fields = next(csv.reader([row[:-1] if row.endswith("\n") else row], strict = True))
+    except csv.Error as e:
+        return "invalid quoting, "+str(e)
+    except StopIteration:
+        fields = []
+    if len(fields) != len(data_types):
+        return str(len(fields))+" columns instead of "+str(len(data_types))
+    for i in range(len(fields)):
+        if fields[i] and not is_valid_value(fields[i], data_types[i]):
+            return "column "+str(i+1)+" is not a valid "+data_types[i]+": "+fields[i][:50]
+    return ""
+
+def count_quotes_in_range(csv_file_name, start, end, block_size = 16*1024*1024):
+    quotes = 0
+    with open(csv_file_name, "rb") as csv_file:
+        csv_file.seek(start)
+        while start < end:
+            block = csv_file.read(min(block_size, end - start))
+            if not block:
+                break
+            quotes += block.count(b'"')
+            start += len(block)
+    return quotes
+
+def validate_csv_range(csv_file_name, start, end, in_quote, data_types, max_bad_rows = 100):
+    # validates the rows that start in [start, end), in_quote tells if start is inside a quoted field,
+    # returns [rows, number of bad rows, [[row index in the range, byte offset, reason], ...]]
+    rows = 0
+    number_bad_rows = 0
+    bad_rows = []
+    row_lines = []
+    row_offset = start
+    offset = start
+    with (gzip.open(csv_file_name, "rb") if csv_file_name.endswith(".gz") else open(csv_file_name, "rb")) as csv_file:
+        at_row_start = True
+        if start > 0:
+            csv_file.seek(start - 1)
+            at_row_start = csv_file.read(1) == b"\n" and not in_quote
+        for line in csv_file:
+            if line.count(b'"') % 2:
+                in_quote = not in_quote
+            if not at_row_start:
+                # the rest of a row that starts in the range before
+                offset += len(line)
+                at_row_start = not in_quote
+                continue
+            if not row_lines:
+                if offset >= end:
+                    break
+                row_offset = offset
+            row_lines.append(line)
+            offset += len(line)
+            if not in_quote:
+                reason = validate_csv_row(b"".join(row_lines), data_types)
+                if reason:
+                    number_bad_rows += 1
+                    if len(bad_rows) < max_bad_rows:
+                        bad_rows.append([rows, row_offset, reason])
+                rows += 1
+                row_lines = []
+    if row_lines:
+        number_bad_rows += 1
+        bad_rows.append([rows, row_offset, "quoted field is not closed before the end of the file"])
+        rows += 1
+    return [rows, number_bad_rows, bad_rows]
+
+def validate_csv_files(csv_file_names, data_types, workers, range_size, logman):
+    # first the quotes in every range are counted, so every range knows if it starts inside a quoted field,
+    # then all ranges are validated, both in a process pool, compressed files can not be split in ranges
+    ranges = {}
+    for csv_file_name in csv_file_names:
+        file_size = os.path.getsize(csv_file_name)
+        if csv_file_name.endswith(".gz") or file_size <= range_size:
+            ranges[csv_file_name] = [[0, float("inf") if csv_file_name.endswith(".gz") else file_size]]
+        else:
+            ranges[csv_file_name] = [[start, min(start + range_size, file_size)] for start in range(0, file_size, range_size)]
+    number_bad_rows = 0
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        quote_futures = dict((csv_file_name, [executor.submit(count_quotes_in_range, csv_file_name, start, end) for [start, end] in ranges[csv_file_name][:-1]]) for csv_file_name in csv_file_names)
+        validate_futures = {}
+        for csv_file_name in csv_file_names:
+            quotes_before = 0
+            validate_futures[csv_file_name] = []
+            for range_index in range(len(ranges[csv_file_name])):
+                [start, end] = ranges[csv_file_name][range_index]
+                validate_futures[csv_file_name].append(executor.submit(validate_csv_range, csv_file_name, start, end, quotes_before % 2 == 1, data_types))
+                if range_index < len(quote_futures[csv_file_name]):
+                    quotes_before += quote_futures[csv_file_name][range_index].result()
+        for csv_file_name in csv_file_names:
+            rows_before = 0
+            bad_rows_in_file = 0
+            for future in validate_futures[csv_file_name]:
+                [rows, number_bad_rows_in_range, bad_rows] = future.result()
+                for [row_index, row_offset, reason] in bad_rows:
+                    log("ERROR: "+csv_file_name+" row "+str(rows_before + row_index + 1)+" (byte offset "+str(row_offset)+"): "+reason, logman)
+                rows_before += rows
+                bad_rows_in_file += number_bad_rows_in_range
+            log("Validated "+csv_file_name+": "+str(rows_before)+" rows, "+str(bad_rows_in_file)+" bad rows", logman)
+            number_bad_rows += bad_rows_in_file
+    return number_bad_rows
+
+def validate_import(view_numbers, view_name, view_path, table_schema, table_name, workers, range_size, manman, sqlman, logman):
+    full_table_name = get_full_table_name(table_schema, table_name)
+    sql = "SELECT DATA_TYPE_NAME FROM SYS.TABLE_COLUMNS WHERE SCHEMA_NAME = '"+table_schema+"' AND TABLE_NAME = '"+table_name+"' ORDER BY POSITION"
+    [data_types, succeeded] = try_execute_sql(sql, "ERROR: Could not read the columns of "+full_table_name, sqlman, logman, True, True)
+    data_types = [data_type.strip("|").strip(" ") for data_type in data_types.split("\n") if data_type.strip("|").strip(" ")]
+    csv_file_names = [get_staged_file_name(view_number, view_name, view_path) for view_number in view_numbers if not (manman.resume and get_view_manifest(view_number, manman).get("import_status") == "done")]
+    missing_files = [csv_file_name for csv_file_name in csv_file_names if not os.path.exists(csv_file_name)]
+    if missing_files:
+        log("ERROR: These csv files do not exist: "+", ".join(missing_files), logman)
+        exit_on_error(sqlman, logman)
+    log("Will now validate "+str(len(csv_file_names))+" csv files against the "+str(len(data_types))+" columns of "+full_table_name+" with "+str(workers)+" processes", logman)
+    start_time = time.time()
+    number_bad_rows = validate_csv_files(csv_file_names, data_types, workers, range_size, logman)
+    if number_bad_rows:
+        log("ERROR: "+str(number_bad_rows)+" bad rows were found, nothing is imported", logman)
+        exit_on_error(sqlman, logman)
+    log("All csv files are valid, the validation took "+str(round(time.time() - start_time, 1))+" seconds", logman)
+
+def get_plan_file_name(view_name, view_path):
+    plan_file_name = view_path+"partition_plan_"+view_name+".json"
+    return plan_file_name
+
+def get_quoted_value(value, data_type):
+    if data_type in ("TINYINT", "SMALLINT", "INTEGER", "BIGINT", "DECIMAL", "SMALLDECIMAL", "REAL", "DOUBLE", "FLOAT"):
+        return value
+    return "'"+value.replace("'", "''")+"'"
+
+def get_sample_quantiles(column, source, sample_clause, number_views, errorlog, sqlman, logman):
+    # the sample is sorted in HANA and only its first value and the values at the positions k*size//number_views are returned,
+    # a position p is returned if the smallest k with k*size >= p*number_views also has k*size < (p+1)*number_views
+    first_k = "FLOOR((POSITION*"+str(number_views)+" + SAMPLE_SIZE - 1)/SAMPLE_SIZE)"
+    sql = ("SELECT POSITION, SAMPLE_SIZE, VALUE FROM (SELECT "+column+" AS VALUE, ROW_NUMBER() OVER (ORDER BY "+column+") - 1 AS POSITION, COUNT(*) OVER () AS SAMPLE_SIZE"
+           " FROM "+source+" "+sample_clause+") WHERE POSITION = 0 OR ("+first_k+"*SAMPLE_SIZE < (POSITION + 1)*"+str(number_views)+" AND "+first_k+" < "+str(number_views)+") ORDER BY POSITION")
+    [quantiles_out, succeeded] = try_execute_sql(sql, errorlog, sqlman, logman, True, True)
+    quantiles = {}
+    sample_size = 0
+    for line in quantiles_out.split("\n"):
+        fields = line.strip(" ").strip("|").split("|", 2)
+        if len(fields) == 3 and is_integer(fields[0].strip(" ")):
+            quantiles[int(fields[0].strip(" "))] = fields[2].strip(" ")
+            sample_size = int(fields[1].strip(" "))
+    return [quantiles, sample_size]
+
+def get_partition_boundaries(quantiles, sample_size, number_views):
+    # the boundary of view k is the first value of the k-th quantile of the sorted sample, duplicated boundaries are merged
+    boundaries = []
+    for k in range(1, number_views):
+        boundary = quantiles[k*sample_size//number_views]
+        if boundary != quantiles[0] and boundary not in boundaries:
+            boundaries.append(boundary)
+    return boundaries
+
+def get_view_condition(column, boundaries, view_index):
+    # view_index is 0 based, the last view also gets the NULL values
+    conditions = []
+    if view_index > 0:
+        conditions.append(column+" >= "+boundaries[view_index-1])
+    if view_index < len(boundaries):
+        conditions.append(column+" < "+boundaries[view_index])
+    condition = " AND ".join(conditions) if conditions else "1 = 1"
+    if view_index == len(boundaries):
+        condition = "("+condition+" OR "+column+" IS NULL)"
+    return condition
+
+def plan_views(table_schema, table_name, partition_column, view_schema, view_name, view_path, number_views, sample_percent, chunk_size, sqlman, logman):
+    full_table_name = get_full_table_name(table_schema, table_name)
+    column = "\\\""+partition_column+"\\\""
+    data_type = get_column_data_type(table_schema, table_name, partition_column, sqlman, logman)
+    if chunk_size:
+        sql = "SELECT TABLE_SIZE FROM SYS.M_TABLES WHERE SCHEMA_NAME = '"+table_schema+"' AND TABLE_NAME = '"+table_name+"'"
+        [table_size, succeeded] = try_execute_sql(sql, "ERROR: Could not read the size of "+full_table_name, sqlman, logman, True, True)
+        table_size_mb = float(table_size.strip("\n").strip("|").strip(" "))/1024/1024
+        number_views = max(1, int(math.ceil(table_size_mb/chunk_size)))
+        log("The in-memory size of "+full_table_name+" is "+str(round(table_size_mb))+" MB, so "+str(number_views)+" views of about "+str(chunk_size)+" MB each are planned", logman)
+    log("Will now sample "+str(sample_percent)+"% of "+full_table_name+" to find the boundaries of "+str(number_views)+" views on "+partition_column, logman)
+    sample_clause = "TABLESAMPLE SYSTEM ("+str(sample_percent)+") WHERE "+column+" IS NOT NULL"
+    [quantiles, sample_size] = get_sample_quantiles(column, full_table_name, sample_clause, number_views, "ERROR: Could not sample "+full_table_name, sqlman, logman)
+    if not sample_size:
+        log("ERROR: The sample of "+full_table_name+" is empty, please increase -sp", logman)
+        os._exit(1)
+    raw_boundaries = get_partition_boundaries(quantiles, sample_size, number_views)
+    boundaries = [get_quoted_value(value, data_type) for value in raw_boundaries]
+    sample_starts = [0] + [min(position for position in quantiles if quantiles[position] == value) for value in raw_boundaries] + [sample_size]
+    if len(boundaries)+1 < number_views:
+        log("WARNING: "+partition_column+" has too few distinct values in the sample, only "+str(len(boundaries)+1)+" views are planned", logman)
+    views = []
+    for view_index in range(len(boundaries)+1):
+        condition = get_view_condition(column, boundaries, view_index)
+        estimated_rows = int((sample_starts[view_index+1] - sample_starts[view_index])*100/sample_percent)
+        views.append({"view": view_name+"_"+str(view_index+1), "condition": condition.replace("\\\"", "\""), "estimated_rows": estimated_rows})
+    plan = {"table_schema": table_schema, "table_name": table_name, "partition_column": partition_column, "data_type": data_type,
+            "sample_percent": sample_percent, "number_views": len(views), "boundaries": boundaries, "views": views}
+    for view_index in range(len(views)):
+        sql = "CREATE VIEW "+view_schema+"."+view_name+"_"+str(view_index+1)+" AS SELECT * FROM "+full_table_name+" WHERE "+get_view_condition(column, boundaries, view_index)
+        log("Will now create "+view_name+"_"+str(view_index+1)+" with "+views[view_index]["condition"]+" (about "+str(views[view_index]["estimated_rows"])+" rows)", logman)
+        try_execute_sql(sql, "ERROR: Could not create "+view_name+"_"+str(view_index+1), sqlman, logman)
+    if not sqlman.execute:
+        log("The views are not created with -es false, so the plan is not saved in "+get_plan_file_name(view_name, view_path)+" (later runs would take -nv from it)", logman)
+        return plan
+    plan_file_name = get_plan_file_name(view_name, view_path)
+    with open(plan_file_name+".tmp", "w") as plan_file:
+        json.dump(plan, plan_file, indent = 2)
+    os.replace(plan_file_name+".tmp", plan_file_name)
+    log("The plan of "+str(len(views))+" views is saved in "+plan_file_name+", export them with -nv "+str(len(views)), logman)
+    return plan
 
 def number_of_rows_in_table(table_schema, table_name, sqlman, logman):
     sql_to_count = "SELECT COUNT(*) FROM "+get_full_table_name(table_schema, table_name)
@@ -207,6 +1401,12 @@ def number_of_rows_in_table(table_schema, table_name, sqlman, logman):
     count_out = count_out.strip("\n").strip("|").strip(" ")
     return int(count_out)
 
+def record_count_of_table(table_schema, table_name, sqlman, logman):
+    sql_to_count = "SELECT SUM(RECORD_COUNT) FROM SYS.M_TABLES WHERE SCHEMA_NAME = '"+table_schema+"' AND TABLE_NAME = '"+table_name+"'"
+    [count_out, succeeded] = try_execute_sql(sql_to_count, "", sqlman, logman, True, True)
+    count_out = count_out.strip("\n").strip("|").strip(" ")
+    return int(count_out) if is_integer(count_out) else 0
+
 def get_sid():
     SID = run_command('echo $SAPSYSTEMNAME').upper()
     return SID
@@ -226,7 +1426,7 @@ def getParameterFromCommandLine(sysargv, flag_string, flag_log, parameter):
     return parameter
 
 def checkIfAcceptedFlag(word):
-    if not word in ["-h", "--help", "-d", "--disclaimer", "-ff", "-k", "-os", "-op", "-es", "-st", "-ts", "-tn", "-vs", "-vn", "-vp", "-nv", "-sv", "-exp"]:
+    if not word in ["-h", "--help", "-d", "--disclaimer", "-ff", "-k", "-os", "-op", "-es", "-st", "-ts", "-tn", "-vs", "-vn", "-vp", "-nv", "-sv", "-exp", "-hs", "-ps", "-mt", "-mw", "-pi", "-mpi", "-par", "-mb", "-plan", "-pc", "-sp", "-cmb", "-ec", "-resume", "-pl", "-msf", "-cs", "-cl", "-ab", "-bd", "-it", "-ib", "-tl", "-at", "-atc", "-dm", "-mk", "-mds", "-val", "-vw", "-vr", "-mf"]:
         print("INPUT ERROR: ", word, " is not one of the accepted input flags. Please see --help for more information.")
         os._exit(1)
 
@@ -236,8 +1436,19 @@ def main():
     dbuserkeys = ""   # The KEY must be maintained in hdbuserstore  
     out_sql = 'false'
     out_path = ""
+    metrics_path = ""
     execute_sql = 'true'
     sleep_time = '60'   # in seconds
+    memory_threshold = '0'   # in %, 0 --> not used, fixed sleep_time between views
+    max_wait = '3600'   # in seconds
+    poll_interval = '10'   # in seconds
+    max_poll_interval = '60'   # in seconds
+    parallel = '1'   # number of views exported/imported at the same time
+    memory_budget = '0'   # in %, 0 --> not used
+    plan_flag = 'false'   # true --> plan (and create) the views instead of export/import
+    partition_column = ""
+    sample_percent = '1'   # in %
+    chunk_size = '0'   # in MB, 0 --> not used, number_views views are planned
     table_schema = ""
     table_name = ""
     view_schema = ""
@@ -246,6 +1457,27 @@ def main():
     number_views = '10'
     start_view_number = '1'
     export_flag = 'true'   # true --> export, false --> import
+    exact_count = 'false'   # true --> COUNT(*) after every import, false --> M_TABLES.RECORD_COUNT
+    resume = 'false'   # true --> skip the views that are already done according to the manifest
+    pipeline = 'false'   # true --> export and import overlap, csv files are deleted after a verified import
+    max_staged_files = '2'
+    compress = 'false'   # true --> exported csv files are compressed and imported through a named pipe
+    compression_level = '1'
+    bisection = 'false'   # true --> views and csv files that fail on memory are split in two
+    bisection_depth = '3'
+    import_threads = '0'   # 0 --> THREADS is not specified
+    import_batch = '0'   # 0 --> BATCH is not specified
+    table_lock = 'false'
+    auto_tune = 'false'   # true --> THREADS and BATCH are chosen by importing parts of the first csv file
+    auto_tune_candidates = '1x10000,4x50000,8x50000,16x200000'
+    delta_merge = 'false'   # true --> auto merge is disabled during the import and the delta is merged by hanaexpimp
+    merge_every = '0'   # number of imported csv files, 0 --> not used
+    merge_delta_size = '0'   # in MB, 0 --> not used
+    validate = 'false'   # true --> all csv files are validated before the import
+    validation_workers = str(os.cpu_count() or 1)
+    validation_range = '256'   # in MB
+    hdbsql_string = "hdbsql"
+    number_sessions = '1'   # 0 --> one hdbsql process per statement
     
     #####################  CHECK INPUT ARGUMENTS #################
     if len(sys.argv) == 1:
@@ -277,8 +1509,19 @@ def main():
     dbuserkey                         = getParameterFromCommandLine(sys.argv, '-k', flag_log, dbuserkeys)
     out_sql                           = getParameterFromCommandLine(sys.argv, '-os', flag_log, out_sql)
     out_path                          = getParameterFromCommandLine(sys.argv, '-op', flag_log, out_path)
+    metrics_path                      = getParameterFromCommandLine(sys.argv, '-mf', flag_log, metrics_path)
     execute_sql                       = getParameterFromCommandLine(sys.argv, '-es', flag_log, execute_sql)
     sleep_time                        = getParameterFromCommandLine(sys.argv, '-st', flag_log, sleep_time)
+    memory_threshold                  = getParameterFromCommandLine(sys.argv, '-mt', flag_log, memory_threshold)
+    max_wait                          = getParameterFromCommandLine(sys.argv, '-mw', flag_log, max_wait)
+    poll_interval                     = getParameterFromCommandLine(sys.argv, '-pi', flag_log, poll_interval)
+    max_poll_interval                 = getParameterFromCommandLine(sys.argv, '-mpi', flag_log, max_poll_interval)
+    parallel                          = getParameterFromCommandLine(sys.argv, '-par', flag_log, parallel)
+    memory_budget                     = getParameterFromCommandLine(sys.argv, '-mb', flag_log, memory_budget)
+    plan_flag                         = getParameterFromCommandLine(sys.argv, '-plan', flag_log, plan_flag)
+    partition_column                  = getParameterFromCommandLine(sys.argv, '-pc', flag_log, partition_column)
+    sample_percent                    = getParameterFromCommandLine(sys.argv, '-sp', flag_log, sample_percent)
+    chunk_size                        = getParameterFromCommandLine(sys.argv, '-cmb', flag_log, chunk_size)
     table_schema                      = getParameterFromCommandLine(sys.argv, '-ts', flag_log, table_schema)
     table_name                        = getParameterFromCommandLine(sys.argv, '-tn', flag_log, table_name)
     view_schema                       = getParameterFromCommandLine(sys.argv, '-vs', flag_log, view_schema)
@@ -287,6 +1530,27 @@ def main():
     number_views                      = getParameterFromCommandLine(sys.argv, '-nv', flag_log, number_views)
     start_view_number                 = getParameterFromCommandLine(sys.argv, '-sv', flag_log, start_view_number)
     export_flag                       = getParameterFromCommandLine(sys.argv, '-exp', flag_log, export_flag)
+    exact_count                       = getParameterFromCommandLine(sys.argv, '-ec', flag_log, exact_count)
+    resume                            = getParameterFromCommandLine(sys.argv, '-resume', flag_log, resume)
+    pipeline                          = getParameterFromCommandLine(sys.argv, '-pl', flag_log, pipeline)
+    max_staged_files                  = getParameterFromCommandLine(sys.argv, '-msf', flag_log, max_staged_files)
+    compress                          = getParameterFromCommandLine(sys.argv, '-cs', flag_log, compress)
+    compression_level                 = getParameterFromCommandLine(sys.argv, '-cl', flag_log, compression_level)
+    bisection                         = getParameterFromCommandLine(sys.argv, '-ab', flag_log, bisection)
+    bisection_depth                   = getParameterFromCommandLine(sys.argv, '-bd', flag_log, bisection_depth)
+    import_threads                    = getParameterFromCommandLine(sys.argv, '-it', flag_log, import_threads)
+    import_batch                      = getParameterFromCommandLine(sys.argv, '-ib', flag_log, import_batch)
+    table_lock                        = getParameterFromCommandLine(sys.argv, '-tl', flag_log, table_lock)
+    auto_tune                         = getParameterFromCommandLine(sys.argv, '-at', flag_log, auto_tune)
+    auto_tune_candidates              = getParameterFromCommandLine(sys.argv, '-atc', flag_log, auto_tune_candidates)
+    delta_merge                       = getParameterFromCommandLine(sys.argv, '-dm', flag_log, delta_merge)
+    merge_every                       = getParameterFromCommandLine(sys.argv, '-mk', flag_log, merge_every)
+    merge_delta_size                  = getParameterFromCommandLine(sys.argv, '-mds', flag_log, merge_delta_size)
+    validate                          = getParameterFromCommandLine(sys.argv, '-val', flag_log, validate)
+    validation_workers                = getParameterFromCommandLine(sys.argv, '-vw', flag_log, validation_workers)
+    validation_range                  = getParameterFromCommandLine(sys.argv, '-vr', flag_log, validation_range)
+    hdbsql_string                     = getParameterFromCommandLine(sys.argv, '-hs', flag_log, hdbsql_string)
+    number_sessions                   = getParameterFromCommandLine(sys.argv, '-ps', flag_log, number_sessions)
 
     ############ GET LOCAL HOST ##########
     local_host = run_command("hostname").replace('\n','') 
@@ -322,6 +1586,23 @@ def main():
     if not is_integer(sleep_time):
         log("INPUT ERROR: -st must be an integer. Please see --help for more information.", logman)
         os._exit(1)
+    ### memory_threshold, -mt
+    if not is_integer(memory_threshold) or not 0 <= int(memory_threshold) <= 100:
+        log("INPUT ERROR: -mt must be an integer between 0 and 100. Please see --help for more information.", logman)
+        os._exit(1)
+    ### max_wait, -mw
+    if not is_integer(max_wait):
+        log("INPUT ERROR: -mw must be an integer. Please see --help for more information.", logman)
+        os._exit(1)
+    ### poll_interval, -pi
+    if not is_integer(poll_interval) or int(poll_interval) < 1:
+        log("INPUT ERROR: -pi must be a positive integer. Please see --help for more information.", logman)
+        os._exit(1)
+    ### max_poll_interval, -mpi
+    if not is_integer(max_poll_interval) or int(max_poll_interval) < int(poll_interval):
+        log("INPUT ERROR: -mpi must be an integer not smaller than -pi. Please see --help for more information.", logman)
+        os._exit(1)
+    sleepman = SleepManager(int(sleep_time), int(memory_threshold), int(max_wait), int(poll_interval), int(max_poll_interval))
     ### table_name, -tn
     if table_name == "":
         log("INPUT ERROR: -tn must be provided with the name of the table to be imported back into. Please see --help for more information.", logman)
@@ -348,10 +1629,143 @@ def main():
         os._exit(1)
     ### export_flag, -exp
     export_flag = checkAndConvertBooleanFlag(export_flag, "-exp", logman)
+    ### exact_count, -ec
+    exact_count = checkAndConvertBooleanFlag(exact_count, "-ec", logman)
+    ### resume, -resume
+    resume = checkAndConvertBooleanFlag(resume, "-resume", logman)
+    ### number_sessions, -ps
+    if not is_integer(number_sessions) or int(number_sessions) < 0:
+        log("INPUT ERROR: -ps must be a non-negative integer. Please see --help for more information.", logman)
+        os._exit(1)
+    number_sessions = int(number_sessions)
+    ### parallel, -par
+    if not is_integer(parallel) or int(parallel) < 1:
+        log("INPUT ERROR: -par must be a positive integer. Please see --help for more information.", logman)
+        os._exit(1)
+    parallel = int(parallel)
+    if number_sessions and number_sessions <= parallel:
+        number_sessions = parallel + 1   # one session per running view and one for the memory checks
+    ### memory_budget, -mb
+    if not is_integer(memory_budget) or not 0 <= int(memory_budget) <= 100:
+        log("INPUT ERROR: -mb must be an integer between 0 and 100. Please see --help for more information.", logman)
+        os._exit(1)
+    memory_budget = int(memory_budget)
+    ### pipeline, -pl
+    pipeline = checkAndConvertBooleanFlag(pipeline, "-pl", logman)
+    if pipeline and parallel > 1:
+        log("INPUT ERROR: -pl true cannot be combined with -par larger than 1. Please see --help for more information.", logman)
+        os._exit(1)
+    if pipeline and number_sessions and number_sessions < 3:
+        number_sessions = 3   # one session for the export, one for the import and one for the memory checks
+    ### max_staged_files, -msf
+    if not is_integer(max_staged_files) or int(max_staged_files) < 1:
+        log("INPUT ERROR: -msf must be a positive integer. Please see --help for more information.", logman)
+        os._exit(1)
+    max_staged_files = int(max_staged_files)
+    ### compress, -cs
+    compress = checkAndConvertBooleanFlag(compress, "-cs", logman)
+    ### compression_level, -cl
+    if not is_integer(compression_level) or not 1 <= int(compression_level) <= 9:
+        log("INPUT ERROR: -cl must be an integer between 1 and 9. Please see --help for more information.", logman)
+        os._exit(1)
+    stageman = StagingManager(compress, int(compression_level))
+    ### plan_flag, -plan
+    plan_flag = checkAndConvertBooleanFlag(plan_flag, "-plan", logman)
+    ### partition_column, -pc
+    if plan_flag and partition_column == "":
+        log("INPUT ERROR: -pc must be provided with the column the views are split on if -plan is true. Please see --help for more information.", logman)
+        os._exit(1)
+    ### sample_percent, -sp
+    try:
+        sample_percent = float(sample_percent)
+    except ValueError:
+        sample_percent = 0
+    if not 0 < sample_percent <= 100:
+        log("INPUT ERROR: -sp must be a number larger than 0 and at most 100. Please see --help for more information.", logman)
+        os._exit(1)
+    ### chunk_size, -cmb
+    if not is_integer(chunk_size) or int(chunk_size) < 0:
+        log("INPUT ERROR: -cmb must be a non-negative integer. Please see --help for more information.", logman)
+        os._exit(1)
+    chunk_size = int(chunk_size)
+    ### bisection, -ab
+    bisection = checkAndConvertBooleanFlag(bisection, "-ab", logman)
+    if bisection and partition_column == "" and (export_flag or pipeline):
+        log("INPUT ERROR: -pc must be provided with the column the views are split on if -ab is true. Please see --help for more information.", logman)
+        os._exit(1)
+    ### bisection_depth, -bd
+    if not is_integer(bisection_depth) or int(bisection_depth) < 1:
+        log("INPUT ERROR: -bd must be a positive integer. Please see --help for more information.", logman)
+        os._exit(1)
+    bisectman = BisectionManager(bisection, partition_column, int(bisection_depth), sample_percent)
+    ### import_threads, -it
+    if not is_integer(import_threads) or int(import_threads) < 0:
+        log("INPUT ERROR: -it must be a non-negative integer. Please see --help for more information.", logman)
+        os._exit(1)
+    ### import_batch, -ib
+    if not is_integer(import_batch) or int(import_batch) < 0:
+        log("INPUT ERROR: -ib must be a non-negative integer. Please see --help for more information.", logman)
+        os._exit(1)
+    ### table_lock, -tl
+    table_lock = checkAndConvertBooleanFlag(table_lock, "-tl", logman)
+    ### auto_tune, -at
+    auto_tune = checkAndConvertBooleanFlag(auto_tune, "-at", logman)
+    ### auto_tune_candidates, -atc
+    auto_tune_candidates = [candidate.split('x') for candidate in auto_tune_candidates.split(',')]
+    if not all(len(candidate) == 2 and is_integer(candidate[0]) and is_integer(candidate[1]) for candidate in auto_tune_candidates):
+        log("INPUT ERROR: -atc must be a comma separated list of <THREADS>x<BATCH>, e.g. 1x10000,4x50000. Please see --help for more information.", logman)
+        os._exit(1)
+    auto_tune_candidates = [[int(candidate[0]), int(candidate[1])] for candidate in auto_tune_candidates]
+    if auto_tune and number_sessions and number_sessions < parallel + 2:
+        number_sessions = parallel + 2   # the auto tune samples the memory in a session of its own
+    ### delta_merge, -dm
+    delta_merge = checkAndConvertBooleanFlag(delta_merge, "-dm", logman)
+    ### merge_every, -mk
+    if not is_integer(merge_every) or int(merge_every) < 0:
+        log("INPUT ERROR: -mk must be a non-negative integer. Please see --help for more information.", logman)
+        os._exit(1)
+    ### merge_delta_size, -mds
+    if not is_integer(merge_delta_size) or int(merge_delta_size) < 0:
+        log("INPUT ERROR: -mds must be a non-negative integer. Please see --help for more information.", logman)
+        os._exit(1)
+    ### validate, -val
+    validate = checkAndConvertBooleanFlag(validate, "-val", logman)
+    ### validation_workers, -vw
+    if not is_integer(validation_workers) or int(validation_workers) < 1:
+        log("INPUT ERROR: -vw must be a positive integer. Please see --help for more information.", logman)
+        os._exit(1)
+    validation_workers = int(validation_workers)
+    ### validation_range, -vr
+    if not is_integer(validation_range) or int(validation_range) < 1:
+        log("INPUT ERROR: -vr must be a positive integer. Please see --help for more information.", logman)
+        os._exit(1)
+    validation_range = int(validation_range)*1024*1024
+    ### metrics_path, -mf
+    if metrics_path:
+        if not metrics_path.endswith("/"):
+            metrics_path = metrics_path+"/"
+        if not os.path.exists(metrics_path):
+            os.makedirs(metrics_path)
+        jobs = 2 if pipeline else parallel
+        if number_sessions and number_sessions < 2*jobs + 1 + (1 if auto_tune else 0):
+            number_sessions = 2*jobs + 1 + (1 if auto_tune else 0)   # every running view samples the memory in a session of its own
+    metman = MetricsManager(metrics_path, view_name)
+    mergeman = DeltaMergeManager(delta_merge, int(merge_every), int(merge_delta_size))
+    impman = ImportManager(int(import_threads), int(import_batch), table_lock, auto_tune and execute_sql, auto_tune_candidates)
+    ### number_views from an earlier plan, if -nv is not specified
+    if not plan_flag and not '-nv' in flag_log and os.path.exists(get_plan_file_name(view_name, view_path)):
+        with open(get_plan_file_name(view_name, view_path)) as plan_file:
+            number_views = str(json.load(plan_file)["number_views"])
+        log("The number of views, "+number_views+", is taken from "+get_plan_file_name(view_name, view_path), logman)
 
     ############# SQL MANAGER ##############
-    hdbsql_string = "hdbsql "
-    sqlman = SQLManager(execute_sql, hdbsql_string, dbuserkey, DATABASE, out_sql)
+    sqlman = SQLManager(execute_sql, hdbsql_string+" ", dbuserkey, DATABASE, out_sql, number_sessions)
+    sqlman.metman = metman
+    # the handler may interrupt a thread that holds the log lock, so it exits from a thread of its own
+    signal.signal(signal.SIGTERM, lambda signal_number, frame: threading.Thread(target = exit_on_sigterm, args = (sqlman, logman)).start())
+
+    ############# MANIFEST MANAGER ##############
+    manman = ManifestManager(get_manifest_file_name(view_name, view_path), resume, execute_sql)
 
     ############ CHECK THAT USER CAN CONNECT TO HANA ###############  
     sql = "SELECT * from DUMMY" 
@@ -363,18 +1777,57 @@ def main():
         os._exit(1)
 
     ################ START #################
-    if export_flag:
-        log("\n***** Starting export of views "+view_name+"_"+str(start_view_number)+" to "+view_name+"_"+str(number_views), logman)
-        tot_nbr_exported_rows = 0
-        for view_number in range(int(start_view_number), int(number_views)+1):
-            tot_nbr_exported_rows += export_view(view_number, view_schema, view_name, view_path, number_views, sleep_time, sqlman, logman)
-        log("Total number of exported rows from all views is "+str(tot_nbr_exported_rows), logman)
-    else:
-        log("\n***** Starting import of csv file "+get_csv_file_name(start_view_number, view_name, view_path)+" to "+get_csv_file_name(number_views, view_name, view_path), logman)
-        count_out = number_of_rows_in_table(table_schema, table_name, sqlman, logman)
-        log("Number of rows in "+get_full_table_name(table_schema, table_name)+" before the import is "+str(count_out), logman)
-        for view_number in range(int(start_view_number), int(number_views)+1):
-            import_view(view_number, view_name, view_path, table_schema, table_name, number_views, sleep_time, sqlman, logman)    
+    try:
+        export_task = lambda view_number, job_logman: export_view(view_number, view_schema, view_name, view_path, number_views, bisectman, stageman, manman, metman, sleepman, sqlman, job_logman)
+        if plan_flag:
+            plan_views(table_schema, table_name, partition_column, view_schema, view_name, view_path, int(number_views), sample_percent, chunk_size, sqlman, logman)
+        elif export_flag and not pipeline:
+            log("\n***** Starting export of views "+view_name+"_"+str(start_view_number)+" to "+view_name+"_"+str(number_views), logman)
+            tot_nbr_exported_rows = sum(run_views(export_task, range(int(start_view_number), int(number_views)+1), parallel, memory_budget, sleepman, sqlman, logman))
+            log("Total number of exported rows from all views is "+str(tot_nbr_exported_rows), logman)
+        else:
+            if pipeline:
+                log("\n***** Starting pipelined export and import of views "+view_name+"_"+str(start_view_number)+" to "+view_name+"_"+str(number_views)+" with at most "+str(max_staged_files)+" staged csv files", logman)
+            else:
+                log("\n***** Starting import of csv file "+get_csv_file_name(start_view_number, view_name, view_path)+" to "+get_csv_file_name(number_views, view_name, view_path), logman)
+            if validate and not pipeline and sqlman.execute:
+                validate_import(range(int(start_view_number), int(number_views)+1), view_name, view_path, table_schema, table_name, validation_workers, validation_range, manman, sqlman, logman)
+            count_out = number_of_rows_in_table(table_schema, table_name, sqlman, logman)
+            log("Number of rows in "+get_full_table_name(table_schema, table_name)+" before the import is "+str(count_out), logman)
+            if resume and "table_rows_before_import" in manman.manifest:
+                check_partly_imported_views(range(int(start_view_number), int(number_views)+1), count_out, manman, logman)
+            else:
+                # a new import, earlier imports of these views must not be skipped by a later -resume
+                for view_number in range(int(start_view_number), int(number_views)+1):
+                    if str(view_number) in manman.manifest["views"]:
+                        update_manifest(view_number, manman, import_status = None, import_start = None, import_seconds = None, import_splits = None)
+                update_manifest(None, manman, table_rows_before_import = count_out)
+            rowman = RowCountManager(count_out, parallel == 1 or pipeline)
+            import_task = lambda view_number, job_logman: import_view(view_number, view_name, view_path, table_schema, table_name, number_views, exact_count, impman, mergeman, bisectman, rowman, manman, metman, sleepman, sqlman, job_logman)
+            if mergeman.enabled:
+                disable_auto_merge(table_schema, table_name, mergeman, sqlman, logman)
+            if pipeline:
+                pipelined_views = [view_number for view_number in range(int(start_view_number), int(number_views)+1) if not (resume and get_view_manifest(view_number, manman).get("import_status") == "done")]
+                run_pipeline(export_task, import_task, pipelined_views, max_staged_files, view_name, view_path, manman, sqlman, logman)
+            else:
+                run_views(import_task, range(int(start_view_number), int(number_views)+1), parallel, memory_budget, sleepman, sqlman, logman)
+            if mergeman.enabled:
+                restore_auto_merge(table_schema, table_name, mergeman, sqlman, logman)
+            count_out = number_of_rows_in_table(table_schema, table_name, sqlman, logman)
+            log("Number of rows in "+get_full_table_name(table_schema, table_name)+" after the import is "+str(count_out), logman)
+            if sqlman.execute and count_out != rowman.expected_rows:
+                log("ERROR: "+str(rowman.expected_rows)+" rows were expected in "+get_full_table_name(table_schema, table_name)+" after the import (rows before the import plus the rows of the csv files), but there are "+str(count_out), logman)
+                exit_on_error(sqlman, logman)
+    except BaseException:
+        # e.g. Ctrl-C, that does not reach the hdbsql processes since they run in sessions of their own
+        if not stop_run(sqlman, logman):
+            threading.Event().wait()   # another thread is stopping the run and exits the process
+        run_exit_sqls(sqlman, logman)
+        close_metrics(metman)
+        raise
+    close_metrics(metman)
+    log("hdbsql statistics: "+str(sqlman.number_statements)+" statements executed over "+str(sqlman.number_connections)+" connections in "+str(round(sqlman.sql_time, 2))+" seconds", logman)
+    sqlman.close()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import sys, os, time, random, json, shutil, subprocess, threading, contextlib, glob, multiprocessing
+import hanaexpimp
+
+def printHelp():
+    print("                                                                                                                                   ")
+    print("DESCRIPTION:                                                                                                                       ")
+    print(" Benchmarks of hanaexpimp that can run without a HANA system.                                                                      ")
+    print(" The row counting benchmark generates csv files, as exported by HANA, of some sizes and compares the time of counting their rows   ")
+    print(" with the shell pipeline cat <csv>|wc -l and with the in-process counter of hanaexpimp (that also calculates the crc32 checksum). ")
+    print(" The end to end benchmark runs main() of hanaexpimp, first the export and then the import, against the stand-ins for hdbsql and  ")
+    print(" hdbuserstore in the folder sim, for every number of views and every size of the views, and reports the time of every phase:   ")
+    print("   spawn         estimated, number of started hdbsql processes times the mean time of starting one and selecting from DUMMY      ")
+    print("   export        EXPORT statements                                                                                                 ")
+    print("   import        IMPORT statements                                                                                                 ")
+    print("   row counting  counting the rows of the csv files (and compressing them with -cs true)                                           ")
+    print("   COUNT(*)      counting the rows of the table                                                                                    ")
+    print("   other sql     all other statements, e.g. the memory checks                                                                      ")
+    print("   sleep         sleeping or waiting for memory between the views                                                                  ")
+    print("   logging       writing the log                                                                                                   ")
+    print(" The phases of views that run in parallel are summed and phases can contain each other (e.g. sleep contains the memory checks),  ")
+    print(" so they do not add up to the total. The simulated system is configured with the SIM_ environment variables of sim/hdbsql, e.g.  ")
+    print(" SIM_IMPORT_SPEED or SIM_MEMORY_PER_MB.                                                                                        ")
+    print("                                                                                                                                   ")
+    print("INPUT ARGUMENTS:                                                                                                                   ")
+    print(" -bp     benchmark path, the folder where the generated files are written (and removed afterwards), created if not there,       ")
+    print("         default: /tmp/                                                                                                            ")
+    print(" -bt     benchmark types, comma separated list of rowcount and endtoend, default: rowcount,endtoend                                ")
+    print(" -bs     benchmark sizes [MB], comma separated list of the sizes of the generated csv files, default: 10,100,1000                   ")
+    print("         ---- END TO END  ----                                                                                                     ")
+    print(" -bv     benchmark views, comma separated list of the numbers of views, default: 1,4                                               ")
+    print(" -bvs    benchmark view sizes [MB], comma separated list of the sizes of the exported csv files, default: 1,10                      ")
+    print(" -bc     benchmark columns, number of columns of the exported csv files, default: 3                                                ")
+    print(" -bf     benchmark flags, flags that are passed on to hanaexpimp, e.g. \"-par 2 -ps 0\", -st is 0 if not specified, default: ''  ")
+    print(" -bb     benchmark baseline, json file with the throughput [MB/s] of every number of views and size, if the file does not exist it ")
+    print("         is written, else the benchmark fails if a throughput is lower than in the file by more than -btol, default: '' (not used)")
+    print(" -btol   benchmark tolerance [%], how much lower than the baseline the throughput may be, default: 20                            ")
+    print("                                                                                                                                   ")
+    print("EXAMPLE:                                                                                                                           ")
+    print("  python hanaexpimp_bench.py -bp /tmp/ -bs 10,100                                                                                  ")
+    print("  SIM_IMPORT_SPEED=200 python hanaexpimp_bench.py -bt endtoend -bv 1,8 -bvs 10 -bf \"-st 0 -par 4\" -bb /tmp/bench_baseline.json   ")
+    print("                                                                                                                                   ")
+    os._exit(1)
+
+PHASES = ["spawn", "export", "import", "row counting", "COUNT(*)", "other sql", "sleep", "logging"]
+
+class PhaseTimer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+    def reset(self):
+        self.seconds = dict((phase, 0.0) for phase in PHASES)
+        self.calls = dict((phase, 0) for phase in PHASES + ["session start"])
+    def add(self, phase, seconds):
+        with self.lock:
+            self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+            self.calls[phase] += 1
+
+def get_sql_phase(sql):
+    if sql.startswith("EXPORT "):
+        return "export"
+    if sql.startswith("IMPORT "):
+        return "import"
+    if "COUNT(*)" in sql or "RECORD_COUNT" in sql:
+        return "COUNT(*)"
+    return "other sql"
+
+def timed(function, get_phase, timer):
+    def timed_function(*args, **kwargs):
+        start_time = time.time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timer.add(get_phase(*args), time.time() - start_time)
+    return timed_function
+
+def instrument(timer):
+    # the functions are looked up in the module when they are called, so main() runs the timed functions
+    hanaexpimp.SQLManager.run = timed(hanaexpimp.SQLManager.run, lambda sqlman, sql: get_sql_phase(sql), timer)
+    hanaexpimp.HDBSQLSession.start = timed(hanaexpimp.HDBSQLSession.start, lambda session: "session start", timer)
+    hanaexpimp.count_csv_rows = timed(hanaexpimp.count_csv_rows, lambda *args: "row counting", timer)
+    hanaexpimp.compress_csv = timed(hanaexpimp.compress_csv, lambda *args: "row counting", timer)
+    hanaexpimp.pace = timed(hanaexpimp.pace, lambda *args: "sleep", timer)
+    hanaexpimp.log = timed(hanaexpimp.log, lambda *args: "logging", timer)
+
+def get_spawn_seconds(times = 5):
+    start_time = time.time()
+    for i in range(times):
+        subprocess.run("hdbsql -j -A -a -x -U BENCH \"SELECT * FROM DUMMY\"", shell=True, capture_output=True, check=True)
+    return (time.time() - start_time)/times
+
+def run_hanaexpimp(args, timer):
+    # main() ends with os._exit on every error, so it runs in a forked process that sends the timings back if it succeeds
+    [receiver, sender] = multiprocessing.Pipe(False)
+    def run():
+        sys.argv = ["hanaexpimp.py"] + args
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            hanaexpimp.main()
+        sender.send([timer.seconds, timer.calls])
+    process = multiprocessing.get_context("fork").Process(target = run)
+    process.start()
+    process.join()
+    if process.exitcode or not receiver.poll():
+        return False
+    [timer.seconds, timer.calls] = receiver.recv()
+    return True
+
+def print_log_tail(log_path, lines = 30):
+    log_lines = []
+    for log_file_name in sorted(glob.glob(log_path+"/hanaexpimplog_*.txt")):
+        with open(log_file_name) as log_file:
+            log_lines += log_file.read().splitlines()
+    print("\n".join(log_lines[-lines:]))
+
+def benchmark_end_to_end(bench_path, views, sizes, columns, flags):
+    bench_folder = bench_path+"hanaexpimp_bench/"
+    os.environ["PATH"] = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sim")+os.pathsep+os.environ["PATH"]
+    os.environ["SIM_STATE"] = bench_folder+"sim_state.json"
+    os.environ["SIM_COLUMNS"] = str(columns)
+    timer = PhaseTimer()
+    instrument(timer)
+    one_shot = '-ps' in flags and flags[flags.index('-ps') + 1] == '0'
+    throughputs = {}
+    print("  views | size [MB] | total [s] |   MB/s | "+" | ".join("%s [s]" % phase for phase in PHASES))
+    for number_views in views:
+        for size_mb in sizes:
+            if os.path.exists(bench_folder):
+                shutil.rmtree(bench_folder)
+            os.makedirs(bench_folder)
+            os.environ["SIM_EXPORT_MB"] = str(size_mb)
+            spawn_seconds = get_spawn_seconds()
+            timer.reset()
+            args = flags + ["-k", "BENCH", "-ts", "BENCH", "-tn", "TABLE", "-vs", "BENCH", "-vn", "VIEW", "-vp", bench_folder, "-nv", str(number_views), "-op", bench_folder+"log", "-st", "0"]
+            start_time = time.time()
+            for export_flag in ["true", "false"]:
+                if not run_hanaexpimp(args + ["-exp", export_flag], timer):
+                    print("ERROR: hanaexpimp failed with "+" ".join(args + ["-exp", export_flag])+", the end of its log:")
+                    print_log_tail(bench_folder+"log")
+                    os._exit(1)
+            total_seconds = time.time() - start_time
+            spawns = timer.calls["session start"] + (sum(timer.calls[phase] for phase in ["export", "import", "COUNT(*)", "other sql"]) if one_shot else 0)
+            timer.seconds["spawn"] = spawns*spawn_seconds
+            throughput = number_views*size_mb/total_seconds
+            throughputs[str(number_views)+"x"+str(size_mb)+"MB"] = round(throughput, 2)
+            print(" %6d | %9d | %9.3f | %6.1f | " % (number_views, size_mb, total_seconds, throughput) + " | ".join("%*.3f" % (len(phase) + 4, timer.seconds[phase]) for phase in PHASES))
+            shutil.rmtree(bench_folder)
+    return throughputs
+
+def check_baseline(baseline_file_name, throughputs, tolerance):
+    if not os.path.exists(baseline_file_name):
+        with open(baseline_file_name, "w") as baseline_file:
+            json.dump(throughputs, baseline_file, indent = 1)
+        print("The throughputs are written to the baseline "+baseline_file_name)
+        return True
+    with open(baseline_file_name) as baseline_file:
+        baseline = json.load(baseline_file)
+    passed = True
+    for configuration in sorted(set(baseline) & set(throughputs)):
+        if throughputs[configuration] < baseline[configuration]*(1 - tolerance/100):
+            print("REGRESSION: the throughput of "+configuration+" is "+str(throughputs[configuration])+" MB/s, the baseline is "+str(baseline[configuration])+" MB/s")
+            passed = False
+    return passed
+
+def generate_csv(csv_file_name, size_mb):
+    # rows as exported by HANA, some quoted fields contain commas, escaped quotes and newlines
+    random.seed(size_mb)
+    templates = 8*['{0},"text {0}",20171214,1.5\n'] + ['{0},"multi line\n text {0}",20171215,2.25\n', '{0},"quoted ""{0}"", with comma",20171216,\n']
+    rows = 0
+    with open(csv_file_name, "w") as csv_file:
+        block = []
+        written = 0
+        while written < size_mb*1024*1024:
+            line = random.choice(templates).format(rows)
+            block.append(line)
+            written += len(line)
+            rows += 1
+            if len(block) == 10000:
+                csv_file.write("".join(block))
+                block = []
+        csv_file.write("".join(block))
+    return rows
+
+def benchmark_row_count(bench_path, sizes):
+    print("  size [MB] |       rows | wc -l rows | wc -l [s] | hanaexpimp rows | hanaexpimp [s] |   speedup")
+    for size_mb in sizes:
+        csv_file_name = bench_path+"hanaexpimp_bench_"+str(size_mb)+"MB.csv"
+        rows = generate_csv(csv_file_name, size_mb)
+        start_time = time.time()
+        wc_rows = int(hanaexpimp.run_command("cat "+csv_file_name+"|wc -l"))
+        wc_time = time.time() - start_time
+        start_time = time.time()
+        [counted_rows, checksum] = hanaexpimp.count_csv_rows(csv_file_name)
+        count_time = time.time() - start_time
+        os.remove(csv_file_name)
+        print(" %10d | %10d | %10d | %9.3f | %15d | %14.3f | %9.2f" % (size_mb, rows, wc_rows, wc_time, counted_rows, count_time, wc_time/max(count_time, 1e-9)))
+        if counted_rows != rows:
+            print("ERROR: hanaexpimp counted "+str(counted_rows)+" rows in "+csv_file_name+", but "+str(rows)+" rows were generated")
+            os._exit(1)
+
+def main():
+    bench_path = "/tmp/"
+    bench_types = "rowcount,endtoend"
+    sizes = "10,100,1000"
+    views = "1,4"
+    view_sizes = "1,10"
+    columns = "3"
+    flags = ""
+    baseline_file_name = ""
+    tolerance = "20"
+    if '-h' in sys.argv or '--help' in sys.argv:
+        printHelp()
+    flag_log = {}
+    bench_path = hanaexpimp.getParameterFromCommandLine(sys.argv, '-bp', flag_log, bench_path)
+    bench_types = hanaexpimp.getParameterFromCommandLine(sys.argv, '-bt', flag_log, bench_types)
+    sizes = hanaexpimp.getParameterFromCommandLine(sys.argv, '-bs', flag_log, sizes)
+    views = hanaexpimp.getParameterFromCommandLine(sys.argv, '-bv', flag_log, views)
+    view_sizes = hanaexpimp.getParameterFromCommandLine(sys.argv, '-bvs', flag_log, view_sizes)
+    columns = hanaexpimp.getParameterFromCommandLine(sys.argv, '-bc', flag_log, columns)
+    flags = hanaexpimp.getParameterFromCommandLine(sys.argv, '-bf', flag_log, flags)
+    baseline_file_name = hanaexpimp.getParameterFromCommandLine(sys.argv, '-bb', flag_log, baseline_file_name)
+    tolerance = hanaexpimp.getParameterFromCommandLine(sys.argv, '-btol', flag_log, tolerance)
+    bench_types = bench_types.split(',')
+    if not all(bench_type in ["rowcount", "endtoend"] for bench_type in bench_types):
+        print("INPUT ERROR: -bt must be a comma separated list of rowcount and endtoend. Please see --help for more information.")
+        os._exit(1)
+    for [flag, value] in [['-bs', sizes], ['-bv', views], ['-bvs', view_sizes]]:
+        if not all(hanaexpimp.is_integer(size) for size in value.split(',')):
+            print("INPUT ERROR: "+flag+" must be a comma separated list of integers. Please see --help for more information.")
+            os._exit(1)
+    if not hanaexpimp.is_integer(columns) or int(columns) < 1:
+        print("INPUT ERROR: -bc must be a positive integer. Please see --help for more information.")
+        os._exit(1)
+    if not hanaexpimp.is_integer(tolerance) or int(tolerance) < 0:
+        print("INPUT ERROR: -btol must be a non-negative integer. Please see --help for more information.")
+        os._exit(1)
+    if not bench_path.endswith("/"):
+        bench_path = bench_path+"/"
+    os.makedirs(bench_path, exist_ok = True)
+    if "rowcount" in bench_types:
+        benchmark_row_count(bench_path, [int(size) for size in sizes.split(',')])
+    if "endtoend" in bench_types:
+        throughputs = benchmark_end_to_end(bench_path, [int(view) for view in views.split(',')], [int(size) for size in view_sizes.split(',')], int(columns), flags.split())
+        if baseline_file_name and not check_baseline(baseline_file_name, throughputs, int(tolerance)):
+            os._exit(1)
+
+if __name__ == '__main__':
+    main()